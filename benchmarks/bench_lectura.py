@@ -0,0 +1,127 @@
+# benchmarks/bench_lectura.py
+"""Benchmark de la lectura de PDFs grandes: copia en memoria frente a mmap.
+
+Genera un formulario de prácticas "escaneado" (una imagen de ruido por página,
+incompresible) de al menos --mb megabytes y mide, para cada modo, el tiempo
+de abrir_pdf + procesar_pdf y el pico de RSS de varios lectores simultáneos
+(uno por proceso, como en un lote de la línea de comandos):
+
+    python benchmarks/bench_lectura.py --mb 60 --lectores 4 --salida lectura.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from pathlib import Path
+
+# Añadir directorio del proyecto al path
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.append(str(RAIZ))
+
+from bench_pipeline import crear_pdf_practicas, pico_rss_mb
+
+def crear_pdf_escaneado(ruta, megabytes):
+    """Crea un PDF de prácticas con páginas de imagen aleatoria hasta el tamaño pedido"""
+    from PIL import Image
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfgen import canvas
+
+    formulario = ruta.with_name("formulario.pdf")
+    crear_pdf_practicas(formulario, 20)
+
+    # Campos del formulario en la primera página y "escaneos" en las siguientes
+    lado = 2000  # 2000x2000 RGB ~ 12 MB por página sin compresión posible
+    paginas = max(1, int(megabytes * 1024 * 1024 // (lado * lado * 3)) + 1)
+    escaneos = ruta.with_name("escaneos.pdf")
+    c = canvas.Canvas(str(escaneos))
+    for _ in range(paginas):
+        imagen = Image.frombytes("RGB", (lado, lado), os.urandom(lado * lado * 3))
+        c.drawImage(ImageReader(imagen), 0, 0, width=595, height=842)
+        c.showPage()
+    c.save()
+
+    import PyPDF2
+    escritor = PyPDF2.PdfWriter()
+    escritor.append(str(formulario))
+    escritor.append(str(escaneos))
+    with open(ruta, 'wb') as salida:
+        escritor.write(salida)
+
+def medir_lector(ruta_pdf, usar_mmap, directorio):
+    """Abre, lee campos y reescribe el PDF en este proceso y devuelve sus métricas"""
+    from core.pdf_processor import abrir_pdf, procesar_campos_pdf, procesar_pdf
+
+    inicio = time.perf_counter()
+    _, campos = abrir_pdf(ruta_pdf, usar_mmap=usar_mmap)
+    datos = procesar_campos_pdf(campos)
+    lectura = time.perf_counter() - inicio
+    procesar_pdf(ruta_pdf, datos, Path(directorio))
+    return {"lectura_s": lectura, "total_s": time.perf_counter() - inicio, "pico_rss_mb": pico_rss_mb()}
+
+def ejecutar(ruta_pdf, lectores, directorio):
+    resultados = []
+    for usar_mmap in (False, True):
+        modo = "mmap" if usar_mmap else "copia"
+        salida = Path(directorio) / modo
+        salida.mkdir(exist_ok=True)
+        inicio = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=lectores, mp_context=get_context("spawn")) as pool:
+            medidas = list(pool.map(medir_lector, [str(ruta_pdf)] * lectores,
+                                    [usar_mmap] * lectores, [str(salida)] * lectores))
+        pared = time.perf_counter() - inicio
+        rss = [m["pico_rss_mb"] for m in medidas if m["pico_rss_mb"] is not None]
+        r = {
+            "modo": modo,
+            "lectores": lectores,
+            "segundos": pared,
+            "lectura_media_s": sum(m["lectura_s"] for m in medidas) / lectores,
+            "total_medio_s": sum(m["total_s"] for m in medidas) / lectores,
+            "pico_rss_max_mb": max(rss) if rss else None,
+            "pico_rss_suma_mb": sum(rss) if rss else None,
+        }
+        resultados.append(r)
+        print(f"{modo:<6} lectores={lectores}  lectura={r['lectura_media_s']:.3f} s  "
+              f"total={r['total_medio_s']:.3f} s  RSS máx={r['pico_rss_max_mb'] or 0:.1f} MB  "
+              f"RSS suma={r['pico_rss_suma_mb'] or 0:.1f} MB")
+    return resultados
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de lectura de PDFs: copia frente a mmap")
+    parser.add_argument("--mb", type=int, default=50, help="Tamaño mínimo del PDF de prueba")
+    parser.add_argument("--lectores", type=int, default=4, help="Lectores simultáneos")
+    parser.add_argument("--pdf", help="Usar un PDF existente en lugar de generarlo")
+    parser.add_argument("--salida", help="Archivo JSON de resultados")
+    args = parser.parse_args(argv)
+
+    directorio = tempfile.mkdtemp(prefix="bench_lectura_")
+    try:
+        if args.pdf:
+            ruta_pdf = Path(args.pdf)
+        else:
+            ruta_pdf = Path(directorio) / "practica_escaneada.pdf"
+            crear_pdf_escaneado(ruta_pdf, args.mb)
+        print(f"PDF: {ruta_pdf.name} ({ruta_pdf.stat().st_size / (1024 * 1024):.1f} MB)")
+        resultados = ejecutar(ruta_pdf, args.lectores, directorio)
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump({
+                "fecha": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "plataforma": platform.platform(),
+                "resultados": resultados,
+            }, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {args.salida}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+# benchmarks/bench_pipeline.py
+"""Benchmark del pipeline: reescritura del formulario, certificados y reporte.
+
+Genera PDFs de prácticas sintéticos con N pares D_i (DNI, nombre) y mide para
+cada etapa el tiempo total, la latencia por elemento (percentiles), el pico de
+memoria (RSS) y los bytes escritos. Cada medición se ejecuta en un proceso
+nuevo (spawn, sin heredar memoria del padre) para que el pico de RSS sea
+el de esa etapa. Los resultados se guardan
+en JSON para comparar versiones:
+
+    python benchmarks/bench_pipeline.py --tamanos 10 100 1000 --salida bench.json
+    python benchmarks/bench_pipeline.py --comparar bench_anterior.json
+"""
+import argparse
+import json
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from pathlib import Path
+
+# Añadir directorio del proyecto al path
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.append(str(RAIZ))
+
+TAMANOS = [10, 100, 1000, 5000]
+ETAPAS = ["procesar_pdf", "certificados", "reporte", "reporte_paginado"]
+LOGO = RAIZ / "aliboat logo.png"
+
+def crear_pdf_practicas(ruta, num_estudiantes):
+    """Crea un PDF de prácticas con campos AcroForm A_/B_/C_/D_ rellenos"""
+    from reportlab.pdfgen import canvas
+
+    campos = {
+        "A_INSTR[0]": "VICENTE RODRIGUEZ ALONSO",
+        "A_DNI[0]": "46866307N",
+        "B_NOMEMB[0]": "BRISA",
+        "B_MATRICULA[0]": "6ª AT-5-7-24",
+        "B_PANTALAN[0]": "C",
+        "B_AMARRE[0]": "41",
+        "B_POTENCIA[0]": "90",
+        "B_ESLORA[0]": "5.8",
+        "B_INSTAL[0]": "MARINA ALICANTE",
+        "C_1[0]": "12/05/2025",
+        "D_LLOC[0]": "Alicante",
+    }
+    for i in range(num_estudiantes):
+        campos[f"D_{2*i + 1}[0]"] = f"{10000000 + i}Z"
+        campos[f"D_{2*i + 2}[0]"] = f"Estudiante{i} Apellido{i} Segundo{i}"
+
+    c = canvas.Canvas(str(ruta))
+    y = 800
+    for nombre, valor in campos.items():
+        if y < 40:
+            c.showPage()
+            y = 800
+        c.acroForm.textfield(name=nombre, value=valor, x=40, y=y, width=300, height=14)
+        y -= 16
+    c.showPage()
+    c.save()
+
+def percentiles(valores):
+    """Devuelve p50/p90/p99/máx en milisegundos"""
+    if not valores:
+        return {}
+    ordenados = sorted(valores)
+    def p(q):
+        return ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))] * 1000
+    return {"p50_ms": p(0.50), "p90_ms": p(0.90), "p99_ms": p(0.99), "max_ms": ordenados[-1] * 1000}
+
+def pico_rss_mb():
+    """Pico de memoria residente del proceso actual en MB (None si no se puede medir)"""
+    # En Linux ru_maxrss conserva el pico del padre tras el exec de spawn;
+    # VmHWM solo cuenta la memoria de este proceso
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for linea in f:
+                if linea.startswith("VmHWM:"):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux devuelve KB, macOS bytes
+        return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+    except ImportError:
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+        except Exception:
+            return None
+
+def bytes_en(ruta):
+    ruta = Path(ruta)
+    if ruta.is_file():
+        return ruta.stat().st_size
+    return sum(p.stat().st_size for p in ruta.rglob("*") if p.is_file())
+
+def medir_etapa(etapa, ruta_pdf, num_estudiantes, directorio):
+    """Ejecuta una etapa y devuelve sus métricas (se llama en un proceso nuevo)"""
+    from core import pdf_processor
+    from core.pdf_processor import leer_campos_pdf, procesar_pdf
+    from core.certificate_builder import generar_certificados
+    from core.report_generator import generar_reporte_estudiantes
+    from core.pipeline import extraer_estudiantes
+
+    datos_pdf = leer_campos_pdf(ruta_pdf, usar_cache=False)
+    output_dir = Path(directorio) / etapa
+    output_dir.mkdir(parents=True, exist_ok=True)
+    latencias = []
+    if etapa == "procesar_pdf":
+        # La lectura de arriba deja el PDF analizado en la caché de abrir_pdf; sin
+        # vaciarla, la etapa solo mediría el rellenado y no el análisis del PDF
+        pdf_processor._lectores.clear()
+
+    inicio = time.perf_counter()
+    if etapa == "procesar_pdf":
+        salida = procesar_pdf(ruta_pdf, datos_pdf, output_dir)
+        if salida is None:
+            raise RuntimeError("procesar_pdf falló")
+    elif etapa == "certificados":
+        marcas = [inicio]
+        def progreso(hechos, total):
+            ahora = time.perf_counter()
+            latencias.append(ahora - marcas[-1])
+            marcas.append(ahora)
+        generar_certificados(datos_pdf, output_dir, LOGO, progreso=progreso)
+    elif etapa == "reporte":
+        generar_reporte_estudiantes(datos_pdf, extraer_estudiantes(datos_pdf), output_dir, paginado=False)
+    elif etapa == "reporte_paginado":
+        generar_reporte_estudiantes(datos_pdf, extraer_estudiantes(datos_pdf), output_dir, paginado=True)
+    segundos = time.perf_counter() - inicio
+
+    if not latencias:
+        latencias = [segundos / max(1, num_estudiantes)]
+    return {
+        "etapa": etapa,
+        "estudiantes": num_estudiantes,
+        "segundos": segundos,
+        "por_elemento_ms": segundos * 1000 / max(1, num_estudiantes),
+        "latencia": percentiles(latencias),
+        "pico_rss_mb": pico_rss_mb(),
+        "bytes_salida": bytes_en(output_dir),
+    }
+
+def ejecutar(tamanos, etapas, directorio):
+    resultados = []
+    for num in tamanos:
+        ruta_pdf = Path(directorio) / f"practica_{num}.pdf"
+        crear_pdf_practicas(ruta_pdf, num)
+        for etapa in etapas:
+            # Un proceso nuevo por medición para aislar el pico de memoria
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                r = pool.submit(medir_etapa, etapa, str(ruta_pdf), num,
+                                str(Path(directorio) / str(num))).result()
+            resultados.append(r)
+            print(f"{etapa:<16} N={num:<6} {r['segundos']:8.3f} s  "
+                  f"{r['por_elemento_ms']:8.2f} ms/elem  "
+                  f"p99={r['latencia'].get('p99_ms', 0):8.2f} ms  "
+                  f"RSS={r['pico_rss_mb'] or 0:7.1f} MB  {r['bytes_salida'] / 1024:10.1f} KB")
+    return resultados
+
+def comparar(actuales, anteriores):
+    """Imprime la variación de tiempo y tamaño respecto a una ejecución anterior"""
+    previos = {(r["etapa"], r["estudiantes"]): r for r in anteriores["resultados"]}
+    print("\n=== COMPARACIÓN ===")
+    for r in actuales:
+        previo = previos.get((r["etapa"], r["estudiantes"]))
+        if not previo:
+            continue
+        tiempo = r["segundos"] / previo["segundos"] if previo["segundos"] else 0
+        tamano = r["bytes_salida"] / previo["bytes_salida"] if previo["bytes_salida"] else 0
+        print(f"{r['etapa']:<16} N={r['estudiantes']:<6} tiempo x{tiempo:.2f}  tamaño x{tamano:.2f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline de certificados")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=TAMANOS)
+    parser.add_argument("--etapas", nargs="+", choices=ETAPAS, default=ETAPAS)
+    parser.add_argument("--salida", help="Archivo JSON de resultados")
+    parser.add_argument("--comparar", help="JSON de una ejecución anterior")
+    args = parser.parse_args(argv)
+
+    directorio = tempfile.mkdtemp(prefix="bench_certificados_")
+    try:
+        resultados = ejecutar(args.tamanos, args.etapas, directorio)
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    informe = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "resultados": resultados,
+    }
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(informe, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {args.salida}")
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            comparar(resultados, json.load(f))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+# cli.py
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from core.catalogo import RUTA_DATOS, obtener_catalogo
+from core.pipeline import generar_desde_pdf
+
+def buscar_pdfs(entradas):
+    """Expande directorios y patrones glob en la lista de PDFs de prácticas"""
+    rutas = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            encontrados = sorted(str(p) for p in Path(entrada).glob("*.pdf"))
+        else:
+            encontrados = sorted(glob.glob(entrada))
+        for ruta in encontrados:
+            if ruta.lower().endswith('.pdf') and ruta not in rutas:
+                rutas.append(ruta)
+    return rutas
+
+def _procesar_pdf(tarea):
+    """Ejecuta el pipeline completo para un PDF (se ejecuta en otro proceso)"""
+    return generar_desde_pdf(*tarea)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Genera certificados y reportes sin interfaz gráfica para varios PDFs de prácticas"
+    )
+    parser.add_argument("entradas", nargs="*", help="PDFs, directorios o patrones glob")
+    parser.add_argument("--instructor", help="Nombre o DNI del instructor (resources/datos.json)")
+    parser.add_argument("--barco", help="Nombre o matrícula del barco (resources/datos.json)")
+    parser.add_argument("--datos", default=RUTA_DATOS, help="Ruta de datos.json")
+    parser.add_argument("--logo", default="aliboat logo.png", help="Ruta del logo")
+    parser.add_argument("--salida", default="output", help="Carpeta base de salida")
+    parser.add_argument("--procesos", type=int,
+                        help="PDFs procesados en paralelo (por defecto, uno por núcleo)")
+    parser.add_argument("--listado", help="CSV o XLSX de estudiantes (DNI y nombre) en lugar de los campos D_ del PDF")
+    parser.add_argument("--archivo", choices=["zip", "tar"],
+                        help="Guardar los certificados de cada PDF en un único ZIP o tar en lugar de PDFs sueltos")
+    parser.add_argument("--perfil", choices=["cprofile", "tracemalloc"],
+                        help="Perfilar cada PDF (se guarda junto a instrumentacion.json)")
+    parser.add_argument("--buscar", metavar="DNI", help="Listar los certificados emitidos a un DNI (registro)")
+    parser.add_argument("--reimprimir", metavar="DNI",
+                        help="Copiar a --salida el último certificado emitido a un DNI sin regenerarlo")
+    parser.add_argument("--fecha", help="Fecha de la práctica (dd/mm/yyyy) para --reimprimir")
+    parser.add_argument("--servir", action="store_true",
+                        help="Arrancar el servicio local de renderizado (procesos ya cargados, cola con prioridad)")
+    parser.add_argument("--servicio", action="store_true",
+                        help="Enviar los PDFs al servicio local en marcha en lugar de procesarlos aquí")
+    parser.add_argument("--puerto", type=int, help="Puerto del servicio local")
+    parser.add_argument("--prioridad", type=int, default=10,
+                        help="Prioridad de los trabajos enviados al servicio (menor = antes)")
+    args = parser.parse_args(argv)
+
+    if args.servir:
+        from core.servicio import servir
+        return servir(args.puerto, args.procesos, args.salida)
+    if args.buscar or args.reimprimir:
+        return _consultar_registro(args)
+    if not args.entradas:
+        parser.error("indique PDFs de prácticas, --buscar o --reimprimir")
+
+    pdfs = buscar_pdfs(args.entradas)
+    if not pdfs:
+        print("No se encontraron PDFs de prácticas")
+        return 1
+
+    catalogo = obtener_catalogo(args.datos)
+    instructor = None
+    if args.instructor:
+        instructor = catalogo.instructor(args.instructor)
+        if instructor is None:
+            print(f"Instructor no encontrado en datos.json: {args.instructor}")
+            return 1
+    barco = None
+    if args.barco:
+        barco_obj = catalogo.barco(args.barco)
+        if barco_obj is None:
+            print(f"Barco no encontrado en datos.json: {args.barco}")
+            return 1
+        barco = barco_obj['nombre']
+
+    # Una subcarpeta por PDF dentro de la carpeta de esta ejecución
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    base = Path(args.salida) / timestamp
+    tareas = []
+    usados = set()
+    for ruta_pdf in pdfs:
+        nombre = Path(ruta_pdf).stem
+        sufijo = 2
+        while nombre in usados:
+            nombre = f"{Path(ruta_pdf).stem}_{sufijo}"
+            sufijo += 1
+        usados.add(nombre)
+        tareas.append((ruta_pdf, str(base / nombre), instructor, barco, args.datos, args.logo,
+                       args.perfil, args.listado, args.archivo))
+
+    inicio = time.perf_counter()
+    procesos = max(1, min(args.procesos or os.cpu_count() or 1, len(tareas)))
+    servicio = _url_servicio(args) if args.servicio else None
+    if servicio:
+        resultados = list(_mostrar(_enviar_al_servicio(servicio, tareas, args)))
+    elif procesos > 1:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            resultados = pool.map(_procesar_pdf, tareas)
+            resultados = list(_mostrar(resultados))
+    else:
+        resultados = list(_mostrar(_procesar_pdf(tarea) for tarea in tareas))
+    segundos = time.perf_counter() - inicio
+
+    correctos = [r for r in resultados if r['error'] is None]
+    certificados = sum(len(r['certificados']) for r in resultados)
+    print("\n=== RESUMEN ===")
+    print(f"PDFs procesados: {len(correctos)}/{len(resultados)}")
+    print(f"Certificados: {certificados}")
+    print(f"Tiempo: {segundos:.2f} s")
+    if segundos > 0:
+        print(f"Rendimiento: {len(correctos) / segundos:.2f} PDFs/s, {certificados / segundos:.2f} certificados/s")
+    print(f"Salida: {base.resolve()}")
+    return 0 if len(correctos) == len(resultados) else 1
+
+def _url_servicio(args):
+    """URL del servicio local si está en marcha (si no, se procesa aquí)"""
+    from core.servicio import servicio_disponible, url_servicio
+    url = url_servicio(args.puerto)
+    if servicio_disponible(url):
+        return url
+    print(f"No hay servicio de renderizado en {url}; se procesa en este proceso")
+    return None
+
+def _enviar_al_servicio(url, tareas, args):
+    """Encola todos los PDFs en el servicio y devuelve los resultados en orden"""
+    from core.servicio import enviar_trabajo, esperar_trabajo, resultado_trabajo
+    enviados = []
+    for ruta_pdf, output_dir, *_ in tareas:
+        try:
+            enviados.append(enviar_trabajo(
+                ruta_pdf, url, esperar=False, prioridad=args.prioridad,
+                instructor=args.instructor, barco=args.barco, datos=args.datos, logo=args.logo,
+                output_dir=output_dir, listado=args.listado, archivo=args.archivo, perfil=args.perfil))
+        except Exception as e:
+            enviados.append({'pdf': ruta_pdf, 'error': str(e)})
+    for resumen in enviados:
+        if 'id' in resumen:
+            resumen = esperar_trabajo(resumen['id'], url)
+        yield resultado_trabajo(resumen)
+
+def _consultar_registro(args):
+    """Búsqueda y reimpresión desde el registro de certificados emitidos"""
+    from config import REGISTRO_CERTIFICADOS
+    from core.registro import RegistroCertificados
+    if not REGISTRO_CERTIFICADOS:
+        print("El registro de certificados está desactivado (REGISTRO_CERTIFICADOS)")
+        return 1
+    with RegistroCertificados(REGISTRO_CERTIFICADOS) as registro:
+        if args.buscar:
+            filas = registro.por_dni(args.buscar)
+            for fila in filas:
+                print(f"{fila['fecha']}  {fila['dni']}  {fila['nombre']}  {fila['barco'] or ''}  "
+                      f"{fila['instructor'] or ''}  {fila['ruta']}")
+            print(f"{len(filas)} certificados para {args.buscar}")
+            return 0
+        copia = registro.reimprimir(args.reimprimir, args.fecha, Path(args.salida))
+        if copia is None:
+            print(f"No hay certificados guardados para {args.reimprimir}")
+            return 1
+        print(f"Certificado: {copia.resolve()}")
+        return 0
+
+def _mostrar(resultados):
+    """Imprime cada resultado a medida que llega"""
+    for resultado in resultados:
+        if resultado['error']:
+            print(f"ERROR {resultado['pdf']}: {resultado['error']}")
+        elif resultado.get('cancelado'):
+            print(f"CANCELADO {resultado['pdf']}: {len(resultado['certificados'])} certificados")
+        else:
+            print(f"OK {resultado['pdf']}: {len(resultado['certificados'])} certificados "
+                  f"en {resultado['segundos']:.2f} s")
+            if resultado['duplicados']:
+                print(f"  AVISO: {len(resultado['duplicados'])} estudiantes ya tenían certificado de esa fecha")
+        yield resultado
+
+if __name__ == "__main__":
+    sys.exit(main())
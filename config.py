@@ -0,0 +1,75 @@
+# config.py
+
+# Procesos usados para generar certificados (1 = secuencial, 0 = todos los núcleos)
+CERTIFICADOS_WORKERS = 1
+
+# "individual" (un PDF por estudiante) o "combinado" (un solo PDF con una página por estudiante)
+CERTIFICADOS_MODO = "individual"
+
+# En modo combinado, dividir además el documento en un archivo por estudiante
+CERTIFICADOS_SEPARAR = False
+
+# Reutilizar (enlazar) los certificados individuales que no han cambiado desde la última ejecución del mismo PDF
+CERTIFICADOS_INCREMENTAL = True
+
+# Empaquetar los certificados en un único archivo en lugar de la carpeta PDFs/
+# (None = archivos sueltos, "zip" o "tar"); se escriben directamente en él
+CERTIFICADOS_ARCHIVO = None
+
+# Registro SQLite de los certificados emitidos en todas las ejecuciones
+# (búsqueda por DNI o fecha, reimpresión y aviso de duplicados); None = desactivado.
+# Conviene un disco local, p. ej. "cache/registro_certificados.sqlite"
+REGISTRO_CERTIFICADOS = None
+
+# Fuentes TrueType de los certificados para nombres con caracteres fuera de Latin-1
+# (None = Times base), p. ej. {"normal": "resources/fonts/DejaVuSerif.ttf",
+# "negrita": "resources/fonts/DejaVuSerif-Bold.ttf"}. Solo se incrustan los glifos usados
+CERTIFICADOS_FUENTES = None
+
+# Plantilla JSON con los textos, imágenes y firmas del certificado (relativa a la
+# carpeta de la aplicación si no existe en la carpeta actual)
+CERTIFICADOS_PLANTILLA = "resources/templates/licencia_navegacion.json"
+
+# Carpeta de cachés persistentes (junto a output/)
+CACHE_DIR = "cache"
+
+# Resolución de impresión a la que se reduce el logo de los certificados
+LOGO_DPI = 300
+
+# Número máximo de PDFs de prácticas recordados en la caché de campos
+CACHE_CAMPOS_MAX = 64
+
+# Reporte en páginas apaisadas fijas (True) o en una única página que crece con cada fila (False)
+REPORTE_PAGINADO = False
+
+# Guardar el PDF modificado como actualización incremental (solo los campos cambiados)
+PDF_ACTUALIZACION_INCREMENTAL = True
+
+# Leer los PDFs de entrada a través de mmap en lugar de copiarlos enteros en memoria
+# (en Windows el archivo queda bloqueado mientras su lector siga en caché)
+PDF_LECTURA_MMAP = False
+
+# Documentos renderizados en memoria que pueden esperar a ser escritos en disco
+# (0 = escribir cada uno en el momento, sin hilo de escritura)
+ESCRITURA_MAX_PENDIENTES = 8
+
+# Perfilado opcional de cada generación: None, "cprofile" (perfil.prof) o "tracemalloc" (memoria)
+INSTRUMENTACION_PERFIL = None
+
+# Servicio local de renderizado (main.py --servir): puerto en 127.0.0.1, procesos
+# siempre cargados y segundos sin trabajos tras los que se vuelven a ejercitar
+SERVICIO_PUERTO = 8765
+SERVICIO_PROCESOS = 2
+SERVICIO_LATIDO = 60
+
+# Archivo con el token de esta instalación que el servicio exige en cada petición
+# (se crea la primera vez; ventana y línea de comandos leen el mismo)
+SERVICIO_TOKEN = "cache/servicio.token"
+
+# La ventana envía la generación al servicio si está en marcha (sin progreso, con cancelación)
+SERVICIO_GUI = False
+
+# Vista previa del certificado en la ventana (requiere PyMuPDF): resolución y
+# número de imágenes recordadas en memoria
+VISTA_PREVIA_DPI = 96
+VISTA_PREVIA_CACHE = 32
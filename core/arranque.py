@@ -0,0 +1,43 @@
+# core/arranque.py
+import importlib
+import sys
+import threading
+import time
+
+# Módulos pesados que la ventana no necesita para mostrarse
+MODULOS_PESADOS = [
+    "PyPDF2",
+    "reportlab.platypus",
+    "core.pdf_processor",
+    "core.certificate_builder",
+    "core.report_generator",
+    "core.pipeline",
+]
+
+def precargar_modulos(modulos=MODULOS_PESADOS):
+    """Importa los módulos pesados para que la primera generación no los espere"""
+    for modulo in modulos:
+        try:
+            importlib.import_module(modulo)
+        except Exception as e:
+            print(f"No se pudo precargar {modulo}: {str(e)}")
+
+def precargar_en_segundo_plano(modulos=MODULOS_PESADOS):
+    """Lanza la precarga en un hilo para no retrasar la ventana"""
+    hilo = threading.Thread(target=precargar_modulos, args=(modulos,), daemon=True)
+    hilo.start()
+    return hilo
+
+def medir_importaciones(modulos):
+    """Importa cada módulo en orden y devuelve [(modulo, segundos)].
+
+    El tiempo de cada módulo solo incluye lo que no habían importado ya los
+    anteriores, así que la suma es el coste total de arranque.
+    """
+    tiempos = []
+    for modulo in modulos:
+        ya_cargado = modulo in sys.modules
+        inicio = time.perf_counter()
+        importlib.import_module(modulo)
+        tiempos.append((modulo, 0.0 if ya_cargado else time.perf_counter() - inicio))
+    return tiempos
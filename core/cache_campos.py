@@ -0,0 +1,128 @@
+# core/cache_campos.py
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from config import CACHE_DIR, CACHE_CAMPOS_MAX
+
+class CacheCampos:
+    """Caché LRU persistente de los campos limpios de cada PDF de prácticas.
+
+    La clave es el hash del contenido más la fecha de modificación, así que un
+    PDF que no ha cambiado se recupera sin volver a analizarlo, incluso después
+    de reiniciar la aplicación. Varios procesos pueden compartir el archivo:
+    al guardar se relee y se añade la entrada nueva bajo un archivo .lock.
+    """
+    def __init__(self, ruta=None, max_entradas=CACHE_CAMPOS_MAX):
+        self.ruta = Path(ruta) if ruta else Path(CACHE_DIR) / "campos_pdf.json"
+        self.max_entradas = max_entradas
+        self._entradas = None
+        self._hashes = {}  # ruta -> (mtime, tamaño, hash) para no rehashear en la misma sesión
+
+    def _leer(self):
+        entradas = OrderedDict()
+        try:
+            with open(self.ruta, 'r', encoding='utf-8') as f:
+                entradas.update(json.load(f))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Caché de campos ignorada: {str(e)}")
+        return entradas
+
+    def _cargar(self):
+        if self._entradas is None:
+            self._entradas = self._leer()
+        return self._entradas
+
+    def _guardar(self, clave):
+        """Añade clave a lo que haya en disco (de este u otros procesos) y lo escribe"""
+        try:
+            self.ruta.parent.mkdir(parents=True, exist_ok=True)
+            with _bloqueo(self.ruta.with_name(f"{self.ruta.name}.lock")):
+                entradas = self._leer()
+                entradas[clave] = self._entradas[clave]
+                entradas.move_to_end(clave)
+                while len(entradas) > self.max_entradas:
+                    entradas.popitem(last=False)
+                temporal = self.ruta.with_name(f"{self.ruta.name}.{os.getpid()}.tmp")
+                with open(temporal, 'w', encoding='utf-8') as f:
+                    json.dump(entradas, f, ensure_ascii=False)
+                os.replace(temporal, self.ruta)
+            self._entradas = entradas
+        except Exception as e:
+            print(f"No se pudo guardar la caché de campos: {str(e)}")
+
+    def clave(self, ruta_pdf):
+        """Calcula la clave hash+mtime del archivo"""
+        ruta_pdf = str(Path(ruta_pdf).resolve())
+        estado = os.stat(ruta_pdf)
+        conocido = self._hashes.get(ruta_pdf)
+        if conocido and conocido[:2] == (estado.st_mtime_ns, estado.st_size):
+            digest = conocido[2]
+        else:
+            sha = hashlib.sha256()
+            with open(ruta_pdf, 'rb') as archivo:
+                for bloque in iter(lambda: archivo.read(1024 * 1024), b""):
+                    sha.update(bloque)
+            digest = sha.hexdigest()
+            self._hashes[ruta_pdf] = (estado.st_mtime_ns, estado.st_size, digest)
+        return f"{digest}:{estado.st_mtime_ns}"
+
+    def obtener(self, clave):
+        entradas = self._cargar()
+        datos = entradas.get(clave)
+        if datos is not None:
+            entradas.move_to_end(clave)
+            return dict(datos)
+        return None
+
+    def guardar(self, clave, datos):
+        entradas = self._cargar()
+        entradas[clave] = dict(datos)
+        entradas.move_to_end(clave)
+        while len(entradas) > self.max_entradas:
+            entradas.popitem(last=False)
+        self._guardar(clave)
+
+@contextmanager
+def _bloqueo(ruta, espera=10, caducidad=60):
+    """Bloqueo entre procesos: archivo creado en exclusiva y borrado al salir.
+
+    Un bloqueo con más de caducidad segundos se considera abandonado (proceso
+    terminado a la fuerza) y se elimina.
+    """
+    limite = time.monotonic() + espera
+    while True:
+        try:
+            os.close(os.open(ruta, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.stat(ruta).st_mtime > caducidad:
+                    os.remove(ruta)
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.monotonic() > limite:
+                raise TimeoutError(f"{ruta} sigue bloqueado")
+            time.sleep(0.02)
+    try:
+        yield
+    finally:
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
+
+_cache = None
+
+def obtener_cache():
+    """Devuelve la caché de campos compartida por el proceso"""
+    global _cache
+    if _cache is None:
+        _cache = CacheCampos()
+    return _cache
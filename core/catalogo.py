@@ -0,0 +1,84 @@
+# core/catalogo.py
+import json
+import os
+import threading
+from pathlib import Path
+
+RUTA_DATOS = 'resources/datos.json'
+
+class Catalogo:
+    """Barcos e instructores de datos.json indexados por nombre, matrícula y DNI.
+
+    El archivo se lee una sola vez y solo se vuelve a leer cuando cambia su
+    fecha de modificación o su tamaño.
+    """
+    def __init__(self, ruta=RUTA_DATOS):
+        self.ruta = Path(ruta)
+        self._lock = threading.Lock()
+        self._firma = None
+        self._barcos = []
+        self._instructores = []
+        self._barcos_por_clave = {}
+        self._instructores_por_clave = {}
+
+    def _actualizar(self):
+        """Recarga el archivo si ha cambiado desde la última lectura"""
+        estado = os.stat(self.ruta)
+        firma = (estado.st_mtime_ns, estado.st_size)
+        if firma == self._firma:
+            return
+        with self._lock:
+            if firma == self._firma:
+                return
+            with open(self.ruta, 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+            barcos = datos.get('barcos', [])
+            instructores = datos.get('instructores', [])
+            barcos_por_clave = {}
+            for barco in barcos:
+                barcos_por_clave[barco['nombre']] = barco
+                barcos_por_clave[barco['matricula']] = barco
+            instructores_por_clave = {}
+            for instructor in instructores:
+                instructores_por_clave[instructor['nombre']] = instructor
+                instructores_por_clave[instructor['dni']] = instructor
+            self._barcos = barcos
+            self._instructores = instructores
+            self._barcos_por_clave = barcos_por_clave
+            self._instructores_por_clave = instructores_por_clave
+            self._firma = firma
+
+    @property
+    def firma(self):
+        """(fecha de modificación, tamaño) del archivo leído; cambia cuando se recarga"""
+        self._actualizar()
+        return self._firma
+
+    @property
+    def barcos(self):
+        self._actualizar()
+        return self._barcos
+
+    @property
+    def instructores(self):
+        self._actualizar()
+        return self._instructores
+
+    def barco(self, clave):
+        """Busca un barco por nombre o matrícula (None si no existe)"""
+        self._actualizar()
+        return self._barcos_por_clave.get(clave)
+
+    def instructor(self, clave):
+        """Busca un instructor por nombre o DNI (None si no existe)"""
+        self._actualizar()
+        return self._instructores_por_clave.get(clave)
+
+_catalogos = {}
+
+def obtener_catalogo(ruta=RUTA_DATOS):
+    """Devuelve el catálogo compartido para la ruta indicada"""
+    clave = str(Path(ruta).resolve())
+    if clave not in _catalogos:
+        _catalogos[clave] = Catalogo(ruta)
+    return _catalogos[clave]
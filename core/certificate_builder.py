@@ -1,13 +1,30 @@
 # core/certificate_builder.py
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Image, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import cm
-from reportlab.lib.enums import TA_JUSTIFY
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Image, Spacer, Table, TableStyle, PageBreak
 from reportlab.pdfgen.canvas import Canvas
 from reportlab.lib.colors import black
 from pathlib import Path
 from reportlab.platypus.flowables import Flowable
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+import hashlib
+import os
+import PyPDF2
+from config import (CERTIFICADOS_WORKERS, CERTIFICADOS_MODO, CERTIFICADOS_SEPARAR, CERTIFICADOS_INCREMENTAL,
+                    CERTIFICADOS_ARCHIVO,
+                    CERTIFICADOS_FUENTES, CERTIFICADOS_PLANTILLA, ESCRITURA_MAX_PENDIENTES, LOGO_DPI)
+from core.escritor import EscritorArchivo, EscritorAsincrono
+from core.listado import ListadoFormulario, como_estudiante
+from core.recursos import imagen_impresion
+from core.template_designer import CAMPOS_ESTUDIANTE, cargar_plantilla
+from core.instrumentacion import contar, etapa, registrar
+from core.manifiesto import CAMPOS_COMUNES, Manifiesto, huella_certificado, huella_logo, reutilizar_archivo
+import time
+
+# Subir al cambiar cómo se dibuja el certificado para que la regeneración
+# incremental no reutilice certificados anteriores (los cambios en la
+# plantilla JSON ya se detectan por su hash)
+VERSION_PLANTILLA = 2
 
 class HorizontalLine(Flowable):
     """Flowable que dibuja una línea horizontal perfectamente alineada"""
@@ -21,31 +38,307 @@ class HorizontalLine(Flowable):
         self.canv.setLineWidth(self.thickness)
         self.canv.line(0, 0, self.width, 0)
 
-def generar_certificados(datos_pdf, output_dir, logo_path):
-    """Genera certificados PDF para todos los estudiantes"""
-    # Extraer estudiantes
-    estudiantes = []
-    i = 1
-    while f"D_{i}" in datos_pdf and f"D_{i+1}" in datos_pdf:
-        estudiantes.append((datos_pdf[f"D_{i}"], datos_pdf[f"D_{i+1}"]))
-        i += 2
+class GeneracionCancelada(Exception):
+    """El usuario canceló la generación en curso"""
+
+class MarcaPagina(Flowable):
+    """Flowable invisible que anota en qué página empieza cada certificado"""
+    def __init__(self, paginas, al_dibujar=None):
+        Flowable.__init__(self)
+        self.paginas = paginas
+        self.al_dibujar = al_dibujar
+        self.width = self.height = 0
+
+    def draw(self):
+        self.paginas.append(self.canv.getPageNumber())
+        if self.al_dibujar:
+            self.al_dibujar(len(self.paginas))
+
+def generar_certificados(datos_pdf, output_dir, logo_path, workers=None, errores=None,
+                         modo=None, separar=None, progreso=None, cancelado=None,
+                         origen=None, incremental=None, estudiantes=None, archivo=None,
+                         registro=None):
+    """Genera certificados PDF para todos los estudiantes y devuelve sus rutas en orden.
 
-    if not estudiantes:
+    workers, modo, separar, archivo e incremental toman el valor de config si son None.
+    """
+    if estudiantes is None:
+        estudiantes = ListadoFormulario(datos_pdf)
+    total = estudiantes.total() if hasattr(estudiantes, 'total') else len(estudiantes)
+    if not total:
         return []
 
-    # Crear directorio para PDFs
+    if archivo is None:
+        archivo = CERTIFICADOS_ARCHIVO
+
+    # Crear directorio para PDFs (con archivo solo da nombre a las entradas)
     pdf_dir = output_dir / "PDFs"
-    pdf_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Generar cada certificado (convertir rutas a strings)
-    for dni, nombre in estudiantes:
-        output_path = pdf_dir / f"Certificado_{nombre.replace(' ', '_')}_{dni}.pdf"
-        generar_certificado_individual({
-            'dni': dni,
-            'nombre': nombre
-        }, datos_pdf, str(output_path), str(logo_path))
-    
-    return list(pdf_dir.glob("*.pdf"))
+    if not archivo:
+        pdf_dir.mkdir(parents=True, exist_ok=True)
+
+    def tareas():
+        # Rutas como strings para poder enviarlas a otros procesos
+        for estudiante in estudiantes:
+            estudiante = como_estudiante(estudiante)
+            nombre = estudiante.nombre_completo
+            output_path = pdf_dir / f"Certificado_{nombre.replace(' ', '_')}_{estudiante.dni}.pdf"
+            yield {'dni': estudiante.dni, 'nombre': nombre}, str(output_path)
+
+    if modo is None:
+        modo = CERTIFICADOS_MODO
+    if modo == "combinado":
+        if separar is None:
+            separar = CERTIFICADOS_SEPARAR
+        return generar_certificados_combinados(tareas(), datos_pdf, output_dir, logo_path,
+                                               separar, errores, progreso, cancelado, archivo,
+                                               registro, origen)
+
+    if incremental is None:
+        incremental = CERTIFICADOS_INCREMENTAL
+    manifiesto = anterior = None
+    if incremental and origen is not None and not archivo:
+        manifiesto = Manifiesto(output_dir, origen)
+        anterior = Manifiesto.anterior(origen)
+        logo = huella_logo(logo_path)
+        plantilla = cargar_plantilla(CERTIFICADOS_PLANTILLA)
+        version = [VERSION_PLANTILLA, plantilla.huella, CERTIFICADOS_FUENTES, LOGO_DPI]
+        campos = sorted(set(CAMPOS_COMUNES) | (plantilla.campos - set(CAMPOS_ESTUDIANTE) - {'logo', 'fecha'}))
+
+    hechos = 0
+    listos = {}  # ruta -> (posición del estudiante, huella)
+    reutilizados = set()
+    registrables = {}  # ruta -> (datos del estudiante, hash del PDF o None si hay que leerlo)
+
+    def avanzar():
+        """Cuenta un certificado terminado y devuelve True si hay que parar"""
+        nonlocal hechos
+        hechos += 1
+        if progreso:
+            progreso(hechos, total)
+        return bool(cancelado and cancelado())
+
+    def pendientes():
+        """Tareas a renderizar; las que no han cambiado se enlazan aquí mismo"""
+        for orden, (datos_estudiante, output_path) in enumerate(tareas()):
+            huella = None
+            if manifiesto is not None:
+                huella = huella_certificado(version, datos_pdf, datos_estudiante, logo, campos)
+                previo = anterior.reutilizable(Path(output_path).name, huella) if anterior else None
+                if previo is not None:
+                    try:
+                        if previo.resolve() != Path(output_path).resolve():
+                            reutilizar_archivo(previo, output_path)
+                        listos[output_path] = (orden, huella)
+                        reutilizados.add(output_path)
+                        # Se vuelven a anotar: el registro pudo activarse después de
+                        # la ejecución anterior y anotar uno ya registrado solo lo actualiza
+                        registrables[output_path] = (datos_estudiante, None)
+                        if avanzar():
+                            return
+                        continue
+                    except OSError as e:
+                        print(f"No se pudo reutilizar {previo}: {str(e)}")
+            yield (datos_estudiante, output_path), huella, orden
+
+    if workers is None:
+        workers = CERTIFICADOS_WORKERS
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    workers = min(workers, total)
+
+    # La plantilla se compila una vez por proceso, no por certificado
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_worker,
+                                   initargs=(datos_pdf, str(logo_path)))
+        resultados = _renderizar_en_pool(pool, pendientes(), workers * 4)
+    else:
+        resultados = _renderizar_en_proceso(datos_pdf, logo_path, pendientes())
+
+    escritor = _crear_escritor(output_dir, archivo)
+    try:
+        for ((datos_estudiante, output_path), huella, orden), (contenido, error, segundos) in resultados:
+            registrar("certificado", segundos)
+            if error is None:
+                escritor.encolar(output_path, contenido, datos_estudiante)
+                listos[output_path] = (orden, huella)
+                if registro is not None:
+                    registrables[output_path] = (datos_estudiante, hashlib.sha256(contenido).hexdigest())
+            else:
+                _anotar_error(datos_estudiante, error, errores)
+            if avanzar():
+                break
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+        escritor.cerrar()
+
+    for datos_estudiante, ruta, error in escritor.errores:
+        if datos_estudiante is None:
+            print(f"Error al guardar {ruta}: {error}")
+        else:
+            _anotar_error(datos_estudiante, error, errores)
+    contar("certificados_reutilizados", len(reutilizados))
+
+    # Devolver en el orden de los estudiantes, reutilizados y nuevos juntos
+    escritos = {str(ruta) for ruta in escritor.escritos}
+    generados = sorted((orden, ruta, huella) for ruta, (orden, huella) in listos.items()
+                       if ruta in escritos or ruta in reutilizados)
+    if manifiesto is not None:
+        for _, ruta, huella in generados:
+            manifiesto.anotar(ruta, huella)
+        manifiesto.guardar()
+    if registro is not None:
+        certificados = []
+        for _, ruta, _ in generados:
+            datos_estudiante, huella_pdf = registrables[ruta]
+            certificados.append((datos_estudiante, escritor.ubicacion(ruta), huella_pdf))
+        _registrar(registro, datos_pdf, origen, certificados)
+    return [escritor.ubicacion(ruta) for _, ruta, _ in generados]
+
+def _registrar(registro, datos_generales, origen, certificados):
+    """Anota (datos del estudiante, ruta, hash) en el registro sin detener el lote si falla"""
+    try:
+        with etapa("registro"):
+            registro.anotar(datos_generales, certificados, origen)
+    except Exception as e:
+        print(f"No se pudieron anotar los certificados en el registro: {str(e)}")
+
+def _crear_escritor(output_dir, archivo):
+    """Escritor de los PDFs: archivos sueltos o entradas de un único ZIP/tar"""
+    if archivo:
+        return EscritorArchivo(output_dir / f"Certificados.{archivo}", output_dir, archivo,
+                               ESCRITURA_MAX_PENDIENTES)
+    return EscritorAsincrono(ESCRITURA_MAX_PENDIENTES)
+
+def _renderizar_en_pool(pool, elementos, en_vuelo):
+    """Renderiza en el pool con como mucho en_vuelo certificados pendientes.
+
+    Devuelve (elemento, resultado) en el orden de entrada; al no enviar todo
+    de golpe, la memoria no crece con el tamaño del listado.
+    """
+    cola = deque()
+    for elemento in elementos:
+        cola.append((elemento, pool.submit(_renderizar_certificado_seguro, elemento[0])))
+        if len(cola) >= en_vuelo:
+            elemento, futuro = cola.popleft()
+            yield elemento, futuro.result()
+    while cola:
+        elemento, futuro = cola.popleft()
+        yield elemento, futuro.result()
+
+def _renderizar_en_proceso(datos_generales, logo_path, elementos):
+    """Renderiza en este proceso, compilando la plantilla solo si hace falta"""
+    iniciado = False
+    for elemento in elementos:
+        if not iniciado:
+            _iniciar_worker(datos_generales, str(logo_path))
+            iniciado = True
+        yield elemento, _renderizar_certificado_seguro(elemento[0])
+
+def _anotar_error(datos_estudiante, error, errores):
+    """Informa del fallo de un certificado y lo añade a errores si se pidió"""
+    print(f"Error al generar certificado de {datos_estudiante['nombre']}: {error}")
+    if errores is not None:
+        errores.append((datos_estudiante['dni'], datos_estudiante['nombre'], error))
+
+def generar_certificados_combinados(tareas, datos_generales, output_dir, logo_path,
+                                    separar=False, errores=None, progreso=None, cancelado=None,
+                                    archivo=None, registro=None, origen=None):
+    """Genera todos los certificados como páginas de un solo PDF con un único canvas"""
+    plantilla = PlantillaCertificado(datos_generales, logo_path)
+
+    def al_dibujar(empezados):
+        if cancelado and cancelado():
+            raise GeneracionCancelada()
+        if progreso and empezados > 1:
+            progreso(empezados - 1, len(incluidas))
+
+    ruta_combinada = output_dir / "PDFs" / "Certificados.pdf"
+
+    elementos = []
+    paginas = []
+    incluidas = []
+    for datos_estudiante, output_path in tareas:
+        try:
+            elementos_estudiante = plantilla.elementos(datos_estudiante)
+        except Exception as e:
+            _anotar_error(datos_estudiante, str(e), errores)
+            continue
+        if elementos:
+            elementos.append(PageBreak())
+        elementos.append(MarcaPagina(paginas, al_dibujar))
+        elementos.extend(elementos_estudiante)
+        incluidas.append((datos_estudiante, output_path))
+
+    if not incluidas:
+        return []
+
+    buffer = BytesIO()
+    try:
+        with etapa("certificados_combinado"):
+            plantilla.documento(buffer).build(elementos)
+    except GeneracionCancelada:
+        return []
+    if progreso:
+        progreso(len(incluidas), len(incluidas))
+
+    huellas = {}
+    escritor = _crear_escritor(output_dir, archivo)
+    try:
+        escritor.encolar(ruta_combinada, buffer.getvalue())
+        if registro is not None:
+            huellas[str(ruta_combinada)] = hashlib.sha256(buffer.getvalue()).hexdigest()
+        if separar:
+            # Dividir por rangos de página: cada certificado va hasta donde empieza el siguiente
+            lector = PyPDF2.PdfReader(buffer)
+            limites = paginas + [len(lector.pages) + 1]
+            for idx, (datos_estudiante, output_path) in enumerate(incluidas):
+                with etapa("separar_certificado"):
+                    escritor_pdf = PyPDF2.PdfWriter()
+                    for num_pagina in range(limites[idx], limites[idx + 1]):
+                        escritor_pdf.add_page(lector.pages[num_pagina - 1])
+                    parte = BytesIO()
+                    escritor_pdf.write(parte)
+                escritor.encolar(output_path, parte.getvalue(), datos_estudiante)
+                if registro is not None:
+                    huellas[output_path] = hashlib.sha256(parte.getvalue()).hexdigest()
+    finally:
+        escritor.cerrar()
+
+    for datos_estudiante, ruta, error in escritor.errores:
+        if datos_estudiante is None:
+            print(f"Error al guardar {ruta}: {error}")
+        else:
+            _anotar_error(datos_estudiante, error, errores)
+    if registro is not None:
+        # Sin separar, todos los estudiantes quedan registrados con el PDF combinado
+        escritos = {str(ruta) for ruta in escritor.escritos}
+        certificados = []
+        for datos_estudiante, output_path in incluidas:
+            ruta = output_path if separar else str(ruta_combinada)
+            if ruta in escritos:
+                certificados.append((datos_estudiante, escritor.ubicacion(ruta), huellas[ruta]))
+        _registrar(registro, datos_generales, origen, certificados)
+    if not separar:
+        return [escritor.ubicacion(ruta) for ruta in escritor.escritos]
+    return [escritor.ubicacion(ruta) for ruta in escritor.escritos if ruta != ruta_combinada]
+
+_plantilla_worker = None
+
+def _iniciar_worker(datos_generales, logo_path):
+    """Compila la plantilla del lote en el proceso actual"""
+    global _plantilla_worker
+    _plantilla_worker = PlantillaCertificado(datos_generales, logo_path)
+
+def _renderizar_certificado_seguro(tarea):
+    """Renderiza un certificado en memoria y devuelve (bytes, error, segundos)"""
+    datos_estudiante, _ = tarea
+    inicio = time.perf_counter()
+    try:
+        return _plantilla_worker.renderizar(datos_estudiante), None, time.perf_counter() - inicio
+    except Exception as e:
+        return None, str(e), time.perf_counter() - inicio
 
 def formatear_fecha(fecha_str):
     """Formatea fecha de dd/mm/yyyy a 'd de mes de yyyy'"""
@@ -56,115 +349,124 @@ def formatear_fecha(fecha_str):
 
 def generar_certificado_individual(datos_estudiante, datos_generales, output_path, logo_path):
     """Genera un certificado individual con diseño profesional"""
-    # Configuración exacta para 14 cm de contenido
-    doc = SimpleDocTemplate(
-        str(output_path),
-        pagesize=A4,
-        leftMargin=2*cm,
-        rightMargin=2*cm,
-        topMargin=1*cm,
-        bottomMargin=(29.7*cm - 2*cm - 14*cm)  # 14cm de contenido
-    )
-    
-    styles = getSampleStyleSheet()
-    
-    # Estilos personalizados
-    cuerpo_style = ParagraphStyle(
-        'Cuerpo',
-        parent=styles['Normal'],
-        fontName='Times-Roman',
-        fontSize=12,
-        leading=14,
-        spaceBefore=0,
-        spaceAfter=0,
-        alignment=TA_JUSTIFY,
-        firstLineIndent=24,
-    )
-    
-    title_style = ParagraphStyle(
-        'Title',
-        parent=styles['Heading1'],
-        fontName='Times-Bold',
-        fontSize=14,
-        alignment=1,
-        spaceBefore=0,
-        spaceAfter=0.2*cm
-    )
-
-    # Elementos del documento
-    elements = []
-    
-    # Logo en esquina superior izquierda (FIXED)
-    if logo_path and Path(logo_path).exists():
-        logo = Image(str(logo_path), width=4*cm, height=2*cm)
-        logo.hAlign = 'LEFT'
-        elements.append(logo)
-        elements.append(Spacer(1, -0.5*cm))  # Espacio después del logo
-    
-    # Título centrado
-    elements.append(Paragraph("LICENCIA DE NAVEGACIÓN", title_style))
-    
-    # Cuerpo del texto
-    texto = (
-        f"D. <b>VICENTE RODRÍGUEZ ALONSO</b>, con DNI: <b>46866307-N</b>, "
-        f"en calidad de Director de: <b>ESCUELA NÁUTICA ALIBOAT</b> declaro bajo mi responsabilidad que "
-        f"<b>{datos_estudiante['nombre']}</b> con DNI/PASAPORTE: <b>{datos_estudiante['dni']}</b> ha recibido la formación teórico-práctica exigida por el "
-        "<b>Real Decreto 875/2014 de 10 de octubre</b> por el que se regulan las titulaciones para el gobierno de las embarcaciones de recreo."
-        "<br/><br/>"
-        
-        f"Las prácticas para la obtención de esta licencia se realizaron en la embarcación <b>{datos_generales['B_NOMEMB']}</b> "
-        f"con matrícula <b>{datos_generales['B_MATRICULA']}</b>, el <b>{formatear_fecha(datos_generales['C_1'])}</b> "
-        "en el <b>Real Club de Regatas Alicante</b>. Para que conste y a petición del interesado, expido el presente certificado, "
-        "copia fiel de lo que figura en el registro que a tal efecto se dispone."
-        "<br/><br/>"
-        
-        f"En {datos_generales['D_LLOC']}, a <b>{formatear_fecha(datos_generales['C_1'])}</b>"
-    )
-    
-    elements.append(Paragraph(texto, cuerpo_style))
-    elements.append(Spacer(1, 2.5*cm))
-    
-    # Firmas PERFECTAMENTE alineadas
-    line_width = 4*cm  # Ancho de las líneas
-    
-    firmas_data = [
-        # Líneas (perfectamente alineadas)
-        [
-            HorizontalLine(line_width),
-            HorizontalLine(line_width),
-            HorizontalLine(line_width)
-        ],
-        # Texto firmas
-        [
-            Paragraph("<b>El instructor</b>", ParagraphStyle('Firma', fontName='Times-Roman', fontSize=12, alignment=1, spaceBefore=0.3*cm, spaceAfter=0)),
-            Paragraph("<b>El director</b>", ParagraphStyle('Firma', fontName='Times-Roman', fontSize=12, alignment=1, spaceBefore=0.3*cm, spaceAfter=0)),
-            Paragraph("<b>El interesado</b>", ParagraphStyle('Firma', fontName='Times-Roman', fontSize=12, alignment=1, spaceBefore=0.3*cm, spaceAfter=0))
-        ],
-        # Nombres
-        [
-            Paragraph(datos_generales['A_INSTR'], ParagraphStyle('Firma', fontName='Times-Roman', fontSize=12, alignment=1, spaceBefore=0.2*cm)),
-            Paragraph("", ParagraphStyle('Firma', fontName='Times-Roman', fontSize=12, alignment=1)),
-            Paragraph(datos_estudiante['nombre'], ParagraphStyle('Firma', fontName='Times-Roman', fontSize=12, alignment=1, spaceBefore=0.2*cm))
-        ],
-        # DNI
-        [
-            Paragraph(f"DNI: {datos_generales['A_DNI']}", ParagraphStyle('Firma', fontName='Times-Roman', fontSize=12, alignment=1, spaceBefore=0.1*cm)),
-            Paragraph("", ParagraphStyle('Firma', fontName='Times-Roman', fontSize=12, alignment=1)),
-            Paragraph(f"DNI: {datos_estudiante['dni']}", ParagraphStyle('Firma', fontName='Times-Roman', fontSize=12, alignment=1, spaceBefore=0.1*cm))
-        ]
-    ]
-    
-    # Tabla con alineación PERFECTA
-    tabla_firmas = Table(firmas_data, colWidths=[6*cm, 6*cm, 6*cm])
-    tabla_firmas.setStyle(TableStyle([
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-        ('LEADING', (0,0), (-1,-1), 12),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 0),
-        ('TOPPADDING', (0,0), (-1,-1), 0),
-    ]))
-    
-    elements.append(tabla_firmas)
-    
-    # Generar PDF
-    doc.build(elements)
+    PlantillaCertificado(datos_generales, logo_path).generar(datos_estudiante, output_path)
+
+class PlantillaCertificado:
+    """Certificado precompilado para un lote.
+
+    El diseño sale de una plantilla JSON (core.template_designer) compilada
+    una vez por proceso. Aquí se sustituyen una sola vez los campos comunes
+    del lote y se crean los flowables fijos (logo decodificado, título,
+    firmas del instructor); cada certificado solo rellena nombre y DNI.
+    Las fuentes TTF configuradas se analizan una vez por proceso (core.fuentes).
+    Con guardar_cache=False no se escribe nada en disco (vista previa).
+    """
+    def __init__(self, datos_generales, logo_path, plantilla=None, guardar_cache=True):
+        self.plantilla = cargar_plantilla(plantilla or CERTIFICADOS_PLANTILLA)
+        valores = dict(datos_generales)
+        valores['logo'] = str(Path(logo_path).resolve()) if logo_path else ""
+        if 'fecha' in self.plantilla.campos:
+            valores['fecha'] = formatear_fecha(datos_generales['C_1'])
+
+        def sustituir(texto, escapar=True):
+            return texto.sustituir(valores, CAMPOS_ESTUDIANTE, escapar)
+
+        # Cada bloque queda como flowables fijos o como texto pendiente del estudiante
+        self.bloques = []
+        for bloque in self.plantilla.bloques:
+            tipo = bloque[0]
+            if tipo == 'texto':
+                _, estilo, texto = bloque
+                texto = sustituir(texto)
+                if isinstance(texto, str):
+                    self.bloques.append(('fijo', [Paragraph(texto, estilo)]))
+                else:
+                    self.bloques.append(('texto', estilo, texto))
+            elif tipo == 'espacio':
+                self.bloques.append(('fijo', [Spacer(1, bloque[1])]))
+            elif tipo == 'imagen':
+                _, ruta, ancho, alto, alineacion, espacio_despues = bloque
+                ruta = sustituir(ruta, escapar=False)
+                if not isinstance(ruta, str):
+                    raise ValueError("La ruta de una imagen no puede depender del estudiante")
+                if not ruta:
+                    continue
+                ruta = self.plantilla.carpeta / ruta
+                if not ruta.exists():
+                    continue
+                imagen = (imagen_impresion(ruta, ancho, alto, guardar=guardar_cache)
+                          or Image(str(ruta), width=ancho, height=alto))
+                imagen.hAlign = alineacion
+                fijos = [imagen]
+                if espacio_despues:
+                    fijos.append(Spacer(1, espacio_despues))
+                self.bloques.append(('fijo', fijos))
+            elif tipo == 'firmas':
+                self.bloques.append(('firmas', self._firmas(bloque, sustituir)))
+
+    def _firmas(self, bloque, sustituir):
+        """Prepara las filas de la tabla de firmas: línea, etiqueta, nombre y DNI"""
+        _, estilo, filas, ancho_columna, ancho_linea, interlineado = bloque
+        celda_vacia = Paragraph("", estilo)
+        columnas = len(filas['etiqueta'][1])
+
+        filas_preparadas = [[HorizontalLine(ancho_linea) for _ in range(columnas)]]
+        for estilo_fila, textos in filas.values():
+            celdas = []
+            for texto in textos:
+                texto = sustituir(texto)
+                if texto == "":
+                    celdas.append(celda_vacia)
+                elif isinstance(texto, str):
+                    celdas.append(Paragraph(texto, estilo_fila))
+                else:
+                    celdas.append((estilo_fila, texto))
+            filas_preparadas.append(celdas)
+
+        tabla_style = TableStyle([
+            ('VALIGN', (0,0), (-1,-1), 'TOP'),
+            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+            ('LEADING', (0,0), (-1,-1), interlineado),
+            ('BOTTOMPADDING', (0,0), (-1,-1), 0),
+            ('TOPPADDING', (0,0), (-1,-1), 0),
+        ])
+        return filas_preparadas, [ancho_columna] * columnas, tabla_style
+
+    def elementos(self, datos_estudiante):
+        """Devuelve los flowables del certificado de un estudiante"""
+        elementos = []
+        for bloque in self.bloques:
+            tipo = bloque[0]
+            if tipo == 'fijo':
+                elementos.extend(bloque[1])
+            elif tipo == 'texto':
+                _, estilo, texto = bloque
+                elementos.append(Paragraph(texto.sustituir(datos_estudiante), estilo))
+            else:
+                filas, anchos, tabla_style = bloque[1]
+                firmas_data = [
+                    [celda if not isinstance(celda, tuple)
+                     else Paragraph(celda[1].sustituir(datos_estudiante), celda[0])
+                     for celda in fila]
+                    for fila in filas
+                ]
+                tabla_firmas = Table(firmas_data, colWidths=anchos)
+                tabla_firmas.setStyle(tabla_style)
+                elementos.append(tabla_firmas)
+        return elementos
+
+    def documento(self, output_path):
+        """Crea el documento con el tamaño y márgenes de la plantilla (ruta o buffer)"""
+        if isinstance(output_path, Path):
+            output_path = str(output_path)
+        return SimpleDocTemplate(output_path, **self.plantilla.pagina)
+
+    def renderizar(self, datos_estudiante):
+        """Devuelve los bytes del PDF del certificado de un estudiante"""
+        buffer = BytesIO()
+        self.documento(buffer).build(self.elementos(datos_estudiante))
+        return buffer.getvalue()
+
+    def generar(self, datos_estudiante, output_path):
+        """Genera el PDF del certificado de un estudiante"""
+        self.documento(output_path).build(self.elementos(datos_estudiante))
@@ -0,0 +1,176 @@
+# core/escritor.py
+import contextvars
+import hashlib
+import io
+import json
+import os
+import queue
+import tarfile
+import threading
+import time
+import zipfile
+from pathlib import Path
+from core.instrumentacion import contar, registrar
+from core.manifiesto import NOMBRE_MANIFIESTO
+
+_FIN = object()
+
+class EscritorAsincrono:
+    """Escribe en disco, desde un hilo propio, documentos ya renderizados en memoria.
+
+    La cola está acotada: encolar() se bloquea cuando hay max_pendientes
+    documentos esperando, de modo que el renderizado no acumula memoria si el
+    disco (o la carpeta de red) va más lento. Con max_pendientes=0 se escribe
+    en el mismo hilo, sin cola.
+    """
+    def __init__(self, max_pendientes=8):
+        self.escritos = []
+        self.errores = []
+        self._lock = threading.Lock()
+        self._cola = None
+        self._hilo = None
+        if max_pendientes > 0:
+            self._cola = queue.Queue(maxsize=max_pendientes)
+            # El hilo hereda el contexto para anotar en la medición activa del lote
+            self._hilo = threading.Thread(target=contextvars.copy_context().run, args=(self._escribir_cola,),
+                                          name="EscritorAsincrono", daemon=True)
+            self._hilo.start()
+
+    def encolar(self, ruta, datos, etiqueta=None):
+        """Añade un documento a la cola (espera si la cola está llena)"""
+        if self._cola is None:
+            self._escribir(ruta, datos, etiqueta)
+        else:
+            self._cola.put((ruta, datos, etiqueta))
+
+    def cerrar(self):
+        """Espera a que se escriba todo lo encolado y devuelve las rutas escritas"""
+        if self._hilo is not None:
+            self._cola.put(_FIN)
+            self._hilo.join()
+            self._hilo = None
+        return self.escritos
+
+    def ubicacion(self, ruta):
+        """Dónde queda guardado el documento encolado con esa ruta"""
+        return Path(ruta)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def _escribir_cola(self):
+        while True:
+            tarea = self._cola.get()
+            if tarea is _FIN:
+                return
+            self._escribir(*tarea)
+
+    def _escribir(self, ruta, datos, etiqueta):
+        """Escribe en un archivo temporal y lo renombra para no dejar PDFs a medias"""
+        ruta = Path(ruta)
+        temporal = ruta.with_name(ruta.name + ".parcial")
+        inicio = time.perf_counter()
+        try:
+            with open(temporal, 'wb') as f:
+                f.write(datos)
+            os.replace(temporal, ruta)
+        except Exception as e:
+            try:
+                os.remove(temporal)
+            except OSError:
+                pass
+            with self._lock:
+                self.errores.append((etiqueta, ruta, str(e)))
+            return
+        registrar("escritura", time.perf_counter() - inicio)
+        contar("bytes_escritos", len(datos))
+        with self._lock:
+            self.escritos.append(ruta)
+
+class EscritorArchivo(EscritorAsincrono):
+    """Guarda los documentos como entradas de un único ZIP o tar, sin archivos sueltos.
+
+    Cada documento se añade al archivo en cuanto llega, con el nombre de su
+    ruta relativa a base (p. ej. PDFs/Certificado_....pdf). Al cerrar se
+    añade al final un manifiesto con el tamaño y el SHA-256 de cada entrada
+    y el archivo, escrito hasta entonces como .parcial, se renombra.
+    """
+    FORMATOS = ('zip', 'tar')
+
+    def __init__(self, ruta, base, formato="zip", max_pendientes=8):
+        if formato not in self.FORMATOS:
+            raise ValueError(f"Formato de archivo no soportado: {formato}")
+        self.ruta = Path(ruta)
+        self.base = Path(base)
+        self.formato = formato
+        self.entradas = {}
+        self._temporal = self.ruta.with_name(self.ruta.name + ".parcial")
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        if formato == "zip":
+            # Los PDFs ya van comprimidos por dentro: deflate rápido
+            self._archivo = zipfile.ZipFile(self._temporal, 'w', zipfile.ZIP_DEFLATED, compresslevel=1)
+        else:
+            self._archivo = tarfile.open(self._temporal, 'w')
+        super().__init__(max_pendientes)
+
+    def entrada(self, ruta):
+        """Nombre de la entrada para una ruta de la carpeta de salida"""
+        try:
+            return Path(ruta).relative_to(self.base).as_posix()
+        except ValueError:
+            return Path(ruta).name
+
+    def ubicacion(self, ruta):
+        return self.ruta / self.entrada(ruta)
+
+    def cerrar(self):
+        """Espera a lo encolado, añade el manifiesto y deja el archivo en su sitio"""
+        super().cerrar()
+        if self._archivo is None:
+            return self.escritos
+        try:
+            manifiesto = {'archivo': self.ruta.name, 'certificados': self.entradas}
+            self._anadir(NOMBRE_MANIFIESTO, json.dumps(manifiesto, ensure_ascii=False, indent=2).encode('utf-8'))
+            self._archivo.close()
+            os.replace(self._temporal, self.ruta)
+        except Exception as e:
+            self._archivo.close()
+            try:
+                os.remove(self._temporal)
+            except OSError:
+                pass
+            self.errores.append((None, self.ruta, str(e)))
+            self.escritos = []
+        self._archivo = None
+        return self.escritos
+
+    def _anadir(self, nombre, datos):
+        if self.formato == "zip":
+            info = zipfile.ZipInfo(nombre, time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0o644 << 16
+            self._archivo.writestr(info, datos, compresslevel=1)
+        else:
+            info = tarfile.TarInfo(nombre)
+            info.size = len(datos)
+            info.mtime = time.time()
+            info.mode = 0o644
+            self._archivo.addfile(info, io.BytesIO(datos))
+
+    def _escribir(self, ruta, datos, etiqueta):
+        nombre = self.entrada(ruta)
+        inicio = time.perf_counter()
+        try:
+            self._anadir(nombre, datos)
+        except Exception as e:
+            with self._lock:
+                self.errores.append((etiqueta, ruta, str(e)))
+            return
+        registrar("escritura", time.perf_counter() - inicio)
+        contar("bytes_escritos", len(datos))
+        with self._lock:
+            self.entradas[nombre] = {'bytes': len(datos), 'sha256': hashlib.sha256(datos).hexdigest()}
+            self.escritos.append(ruta)
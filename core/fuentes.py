@@ -0,0 +1,48 @@
+# core/fuentes.py
+from pathlib import Path
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.lib.fonts import addMapping
+from config import CERTIFICADOS_FUENTES
+
+FUENTES_BASE = ("Times-Roman", "Times-Bold")
+
+# Fuentes ya analizadas en este proceso: ruta -> nombre registrado
+_registradas = {}
+_familias = {}
+
+def fuentes_certificado(fuentes=None):
+    """Devuelve los nombres (normal, negrita) de las fuentes del certificado.
+
+    Las TTF se analizan y registran una sola vez por proceso; ReportLab
+    incrusta en cada documento solo el subconjunto de glifos que usa. Si no
+    hay TTF configuradas o no se pueden cargar se usan las Times base.
+    """
+    if fuentes is None:
+        fuentes = CERTIFICADOS_FUENTES
+    if not fuentes:
+        return FUENTES_BASE
+    clave = (fuentes['normal'], fuentes.get('negrita'))
+    if clave not in _familias:
+        try:
+            normal = _registrar(fuentes['normal'])
+            negrita = _registrar(fuentes.get('negrita') or fuentes['normal'])
+            # <b> en los párrafos usa la variante negrita de la familia
+            addMapping(normal, 0, 0, normal)
+            addMapping(normal, 1, 0, negrita)
+            addMapping(normal, 0, 1, normal)
+            addMapping(normal, 1, 1, negrita)
+            _familias[clave] = (normal, negrita)
+        except Exception as e:
+            print(f"No se pudieron cargar las fuentes TTF, se usa Times: {str(e)}")
+            _familias[clave] = FUENTES_BASE
+    return _familias[clave]
+
+def _registrar(ruta):
+    """Registra la TTF una vez y devuelve su nombre"""
+    ruta = str(Path(ruta).resolve())
+    if ruta not in _registradas:
+        nombre = Path(ruta).stem
+        pdfmetrics.registerFont(TTFont(nombre, ruta))
+        _registradas[ruta] = nombre
+    return _registradas[ruta]
@@ -0,0 +1,175 @@
+# core/instrumentacion.py
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+from config import INSTRUMENTACION_PERFIL
+
+# Medición activa en el contexto actual: cada hilo o ejecución concurrente
+# tiene la suya y un with anidado restaura la anterior al salir
+_activa = contextvars.ContextVar("medicion_activa", default=None)
+
+class Medicion:
+    """Tiempos y contadores de una ejecución del pipeline.
+
+    Mientras está activa (with medicion: ...) las funciones etapa(),
+    registrar() y contar() de este módulo anotan en ella desde el mismo hilo
+    (o desde hilos auxiliares lanzados con contextvars.copy_context()). Con
+    perfil="cprofile" o "tracemalloc" además se perfila el tiempo de CPU o
+    la memoria del código ejecutado dentro del with.
+    """
+    def __init__(self, perfil=None):
+        if perfil is None:
+            perfil = INSTRUMENTACION_PERFIL
+        self.perfil = perfil
+        self.inicio = datetime.now()
+        self.duraciones = {}
+        self.contadores = {}
+        self._lock = threading.Lock()
+        self._entradas = 0
+        self._tokens = []  # (hilo, token de _activa) de cada with abierto
+        self._perfilador = None
+        self._memoria = None
+
+    def __enter__(self):
+        with self._lock:
+            self._tokens.append((threading.get_ident(), _activa.set(self)))
+        self._entradas += 1
+        if self._entradas > 1:
+            return self
+        if self.perfil == "cprofile":
+            import cProfile
+            if self._perfilador is None:
+                self._perfilador = cProfile.Profile()
+            self._perfilador.enable()
+        elif self.perfil == "tracemalloc":
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(10)
+        return self
+
+    def __exit__(self, *exc):
+        hilo = threading.get_ident()
+        with self._lock:
+            indice = max(i for i, (ident, _) in enumerate(self._tokens) if ident == hilo)
+            _, token = self._tokens.pop(indice)
+        _activa.reset(token)
+        self._entradas -= 1
+        if self._entradas > 0:
+            return
+        if self._perfilador is not None:
+            self._perfilador.disable()
+        elif self.perfil == "tracemalloc":
+            self._capturar_memoria()
+
+    @contextmanager
+    def etapa(self, nombre):
+        """Mide el bloque y lo suma a la etapa indicada"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(nombre, time.perf_counter() - inicio)
+
+    def registrar(self, nombre, segundos):
+        """Añade una duración ya medida (p. ej. en otro proceso)"""
+        with self._lock:
+            self.duraciones.setdefault(nombre, []).append(segundos)
+
+    def contar(self, nombre, n=1):
+        with self._lock:
+            self.contadores[nombre] = self.contadores.get(nombre, 0) + n
+
+    def _capturar_memoria(self):
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            return
+        actual, pico = tracemalloc.get_traced_memory()
+        lineas = tracemalloc.take_snapshot().statistics('lineno')[:15]
+        self._memoria = {
+            "actual_mb": actual / (1024 * 1024),
+            "pico_mb": pico / (1024 * 1024),
+            "principales": [
+                {"linea": str(estadistica.traceback[0]), "kb": estadistica.size / 1024,
+                 "bloques": estadistica.count}
+                for estadistica in lineas
+            ],
+        }
+
+    def resumen(self):
+        """Devuelve tiempos por etapa, contadores y perfil como diccionario"""
+        etapas = {}
+        with self._lock:
+            duraciones = {nombre: sorted(valores) for nombre, valores in self.duraciones.items()}
+            contadores = dict(self.contadores)
+        for nombre, valores in duraciones.items():
+            total = sum(valores)
+            etapas[nombre] = {
+                "veces": len(valores),
+                "total_s": total,
+                "medio_ms": total * 1000 / len(valores),
+                "p50_ms": valores[len(valores) // 2] * 1000,
+                "p95_ms": valores[min(len(valores) - 1, int(len(valores) * 0.95))] * 1000,
+                "max_ms": valores[-1] * 1000,
+            }
+        resumen = {
+            "inicio": self.inicio.isoformat(timespec="seconds"),
+            "segundos": (datetime.now() - self.inicio).total_seconds(),
+            "etapas": etapas,
+            "contadores": contadores,
+        }
+        if self.perfil:
+            resumen["perfil"] = self.perfil
+        if self._perfilador is not None:
+            resumen["funciones"] = self._funciones_principales()
+        if self._memoria is not None:
+            resumen["memoria"] = self._memoria
+        return resumen
+
+    def _funciones_principales(self, cuantas=25):
+        """Funciones con más tiempo acumulado según cProfile"""
+        import pstats
+        estadisticas = pstats.Stats(self._perfilador)
+        filas = []
+        for (archivo, linea, funcion), (_, llamadas, propio, acumulado, _) in estadisticas.stats.items():
+            filas.append({
+                "funcion": f"{Path(archivo).name}:{linea}({funcion})",
+                "llamadas": llamadas,
+                "propio_s": propio,
+                "acumulado_s": acumulado,
+            })
+        filas.sort(key=lambda fila: fila["acumulado_s"], reverse=True)
+        return filas[:cuantas]
+
+    def guardar(self, output_dir):
+        """Escribe instrumentacion.json (y perfil.prof con cProfile) en la carpeta de salida"""
+        output_dir = Path(output_dir)
+        if self._perfilador is not None:
+            self._perfilador.dump_stats(str(output_dir / "perfil.prof"))
+        ruta = output_dir / "instrumentacion.json"
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump(self.resumen(), f, indent=2, ensure_ascii=False)
+        if self.perfil == "tracemalloc":
+            import tracemalloc
+            tracemalloc.stop()
+        return ruta
+
+def etapa(nombre):
+    """Mide el bloque en la medición activa (no hace nada si no hay ninguna)"""
+    medicion = _activa.get()
+    if medicion is None:
+        return nullcontext()
+    return medicion.etapa(nombre)
+
+def registrar(nombre, segundos):
+    medicion = _activa.get()
+    if medicion is not None:
+        medicion.registrar(nombre, segundos)
+
+def contar(nombre, n=1):
+    medicion = _activa.get()
+    if medicion is not None:
+        medicion.contar(nombre, n)
@@ -0,0 +1,215 @@
+# core/listado.py
+import codecs
+import csv
+import os
+import unicodedata
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import NamedTuple
+
+class Estudiante(NamedTuple):
+    """Datos de un estudiante tal como los usan certificados y reporte"""
+    dni: str
+    nombre_completo: str
+    nombre: str
+    apellido1: str
+    apellido2: str
+
+def separar_nombre_completo(nombre_completo):
+    """Separa nombres y apellidos usando coma como separador"""
+    if ',' in nombre_completo:
+        # Formato: "Apellidos, Nombres"
+        partes = nombre_completo.strip().split(',', 1)
+        nombres = partes[0].strip()
+        apellidos = partes[1].strip() if len(partes) > 1 else ""
+
+        # Dividir apellidos en dos partes si es necesario
+        apellidos_partes = apellidos.split()
+        if len(apellidos_partes) >= 2:
+            apellido1 = apellidos_partes[0]
+            apellido2 = " ".join(apellidos_partes[1:])
+        else:
+            apellido1 = apellidos
+            apellido2 = ""
+
+        return nombres, apellido1, apellido2
+    else:
+        # Mantener lógica original si no hay coma
+        partes = nombre_completo.strip().split()
+        if len(partes) == 0:
+            return ("", "", "")
+        elif len(partes) == 1:
+            return (partes[0], "", "")
+        elif len(partes) == 2:
+            return (partes[0], partes[1], "")
+        else:
+            return (" ".join(partes[:-2]), partes[-2], partes[-1])
+
+def crear_estudiante(dni, nombre_completo):
+    """Crea el registro separando el nombre completo en nombre y apellidos"""
+    return Estudiante(dni, nombre_completo, *separar_nombre_completo(nombre_completo))
+
+def como_estudiante(estudiante):
+    """Acepta un Estudiante o un par (dni, nombre completo)"""
+    if isinstance(estudiante, Estudiante):
+        return estudiante
+    dni, nombre_completo = estudiante
+    return crear_estudiante(dni, nombre_completo)
+
+class ListadoFormulario:
+    """Estudiantes de los pares de campos D_i (DNI) / D_i+1 (nombre) del formulario"""
+    def __init__(self, datos_pdf):
+        self.datos_pdf = datos_pdf
+
+    def __iter__(self):
+        i = 1
+        while f"D_{i}" in self.datos_pdf and f"D_{i+1}" in self.datos_pdf:
+            yield crear_estudiante(self.datos_pdf[f"D_{i}"], self.datos_pdf[f"D_{i+1}"])
+            i += 2
+
+    def total(self):
+        return sum(1 for _ in self)
+
+# Cabeceras aceptadas en CSV/XLSX (en minúsculas, sin tildes ni signos)
+COLUMNAS = {
+    'dni': ('dni', 'dnipasaporte', 'pasaporte', 'nif', 'nie', 'documento'),
+    'nombre_completo': ('nombrecompleto', 'nombreyapellidos', 'alumno', 'estudiante'),
+    'nombre': ('nombre', 'nombres'),
+    'apellido1': ('apellido1', 'primerapellido'),
+    'apellido2': ('apellido2', 'segundoapellido'),
+    'apellidos': ('apellidos',),
+}
+
+def _normalizar(cabecera):
+    texto = unicodedata.normalize('NFKD', str(cabecera or '')).lower()
+    return ''.join(c for c in texto if c.isalnum())
+
+class _ListadoTabla(ABC):
+    """Base de los listados en forma de tabla con una fila de cabecera.
+
+    Las filas se leen y convierten una a una al recorrer el listado, sin
+    cargar el archivo entero; cada recorrido vuelve a abrir el archivo.
+    """
+    def __init__(self, ruta):
+        self.ruta = Path(ruta)
+
+    @abstractmethod
+    def _filas(self):
+        """Generador de filas (secuencias de celdas), la primera es la cabecera"""
+
+    def __iter__(self):
+        filas = self._filas()
+        cabecera = next(filas, None)
+        if cabecera is None:
+            return
+        columnas = self._columnas(cabecera)
+        for fila in filas:
+            estudiante = self._estudiante(fila, columnas)
+            if estudiante is not None:
+                yield estudiante
+
+    def total(self):
+        """Número de filas con datos (recorre el archivo sin guardar las filas)"""
+        return sum(1 for _ in self)
+
+    def _columnas(self, cabecera):
+        """Índice de cada columna reconocida en la cabecera"""
+        columnas = {}
+        for indice, texto in enumerate(cabecera):
+            normalizado = _normalizar(texto)
+            for clave, nombres in COLUMNAS.items():
+                if normalizado in nombres and clave not in columnas:
+                    columnas[clave] = indice
+        if 'dni' not in columnas or not ({'nombre_completo', 'nombre'} & columnas.keys()):
+            raise ValueError(f"'{self.ruta.name}' necesita columnas de DNI y nombre "
+                             f"(cabecera encontrada: {list(cabecera)})")
+        return columnas
+
+    def _estudiante(self, fila, columnas):
+        def valor(clave):
+            indice = columnas.get(clave)
+            if indice is None or indice >= len(fila) or fila[indice] is None:
+                return ""
+            return str(fila[indice]).strip()
+
+        dni = valor('dni')
+        if 'nombre_completo' in columnas:
+            nombre_completo = valor('nombre_completo')
+            if not (dni or nombre_completo):
+                return None
+            return crear_estudiante(dni, nombre_completo)
+
+        # Nombre y apellidos en columnas separadas: no hace falta adivinar la división
+        nombre = valor('nombre')
+        if 'apellido1' in columnas or 'apellido2' in columnas:
+            apellido1, apellido2 = valor('apellido1'), valor('apellido2')
+        elif 'apellidos' in columnas:
+            apellidos = valor('apellidos').split(None, 1)
+            apellido1 = apellidos[0] if apellidos else ""
+            apellido2 = apellidos[1] if len(apellidos) > 1 else ""
+        else:
+            if not (dni or nombre):
+                return None
+            return crear_estudiante(dni, nombre)
+        nombre_completo = " ".join(parte for parte in (nombre, apellido1, apellido2) if parte)
+        if not (dni or nombre_completo):
+            return None
+        return Estudiante(dni, nombre_completo, nombre, apellido1, apellido2)
+
+class ListadoCSV(_ListadoTabla):
+    """Listado de estudiantes en CSV (separador ; , o tabulador, detectado)"""
+    def __init__(self, ruta):
+        super().__init__(ruta)
+        self._detectada = None  # (fecha de modificación, tamaño, codificación)
+
+    def _codificacion(self):
+        """Codificación del archivo, detectada una vez mientras no cambie"""
+        estado = os.stat(self.ruta)
+        firma = (estado.st_mtime_ns, estado.st_size)
+        if self._detectada is None or self._detectada[:2] != firma:
+            self._detectada = firma + (self._detectar_codificacion(),)
+        return self._detectada[2]
+
+    def _detectar_codificacion(self):
+        """UTF-8 (con o sin BOM de Excel) si todo el archivo lo es; si no, Windows-1252"""
+        decodificador = codecs.getincrementaldecoder('utf-8')()
+        try:
+            with open(self.ruta, 'rb') as f:
+                for bloque in iter(lambda: f.read(1024 * 1024), b""):
+                    decodificador.decode(bloque)
+            decodificador.decode(b"", final=True)
+        except UnicodeDecodeError:
+            return 'cp1252'
+        return 'utf-8-sig'
+
+    def _filas(self):
+        with open(self.ruta, 'r', encoding=self._codificacion(), newline='') as f:
+            muestra = f.read(8192)
+            f.seek(0)
+            try:
+                dialecto = csv.Sniffer().sniff(muestra, delimiters=";,\t")
+            except csv.Error:
+                dialecto = csv.excel
+            yield from csv.reader(f, dialecto)
+
+class ListadoXLSX(_ListadoTabla):
+    """Listado de estudiantes en la primera hoja de un XLSX (requiere openpyxl)"""
+    def _filas(self):
+        try:
+            import openpyxl
+        except ImportError:
+            raise RuntimeError("Para leer listados XLSX hace falta openpyxl (pip install openpyxl)")
+        libro = openpyxl.load_workbook(self.ruta, read_only=True, data_only=True)
+        try:
+            yield from libro.worksheets[0].iter_rows(values_only=True)
+        finally:
+            libro.close()
+
+def abrir_listado(ruta):
+    """Devuelve el listado adecuado según la extensión del archivo"""
+    extension = Path(ruta).suffix.lower()
+    if extension in ('.csv', '.txt'):
+        return ListadoCSV(ruta)
+    if extension in ('.xlsx', '.xlsm'):
+        return ListadoXLSX(ruta)
+    raise ValueError(f"Formato de listado no soportado: {Path(ruta).name}")
@@ -0,0 +1,104 @@
+# core/manifiesto.py
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from config import CACHE_DIR
+
+# Campos del formulario que aparecen en todos los certificados
+CAMPOS_COMUNES = ('A_INSTR', 'A_DNI', 'B_NOMEMB', 'B_MATRICULA', 'C_1', 'D_LLOC')
+
+NOMBRE_MANIFIESTO = "manifiesto_certificados.json"
+
+def huella_logo(logo_path):
+    """Identifica el logo por ruta, tamaño y fecha (sin leerlo entero)"""
+    if not logo_path or not Path(logo_path).exists():
+        return None
+    estado = os.stat(logo_path)
+    return [str(Path(logo_path).resolve()), estado.st_size, estado.st_mtime_ns]
+
+def huella_certificado(version, datos_generales, datos_estudiante, logo, campos=CAMPOS_COMUNES):
+    """Hash de todo lo que determina el contenido de un certificado"""
+    entradas = [
+        version,
+        [datos_generales.get(campo) for campo in campos],
+        datos_estudiante['dni'],
+        datos_estudiante['nombre'],
+        logo,
+    ]
+    return hashlib.sha256(json.dumps(entradas, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+class Manifiesto:
+    """Huella de cada certificado de una ejecución, guardada junto a su salida.
+
+    Cada PDF de prácticas recuerda (en la carpeta de caché) el manifiesto de
+    su última ejecución, de modo que al repetirla solo se renderizan los
+    certificados cuya huella ha cambiado y el resto se enlaza desde allí.
+    """
+    def __init__(self, output_dir, origen):
+        self.ruta = Path(output_dir) / NOMBRE_MANIFIESTO
+        self.origen = str(Path(origen).resolve())
+        self.certificados = {}
+
+    @classmethod
+    def anterior(cls, origen):
+        """Manifiesto de la última ejecución para el PDF de origen (None si no hay)"""
+        indice = _ruta_indice(origen)
+        try:
+            with open(indice, 'r', encoding='utf-8') as f:
+                ruta = Path(json.load(f)['manifiesto'])
+            with open(ruta, 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Manifiesto anterior ignorado: {str(e)}")
+            return None
+        manifiesto = cls(ruta.parent, origen)
+        manifiesto.certificados = datos.get('certificados', {})
+        return manifiesto
+
+    def reutilizable(self, nombre_archivo, huella):
+        """Ruta del certificado anterior con la misma huella, si sigue intacto"""
+        entrada = self.certificados.get(nombre_archivo)
+        if not entrada or entrada['huella'] != huella:
+            return None
+        ruta = self.ruta.parent / "PDFs" / nombre_archivo
+        try:
+            if ruta.stat().st_size != entrada['bytes']:
+                return None
+        except OSError:
+            return None
+        return ruta
+
+    def anotar(self, ruta, huella):
+        self.certificados[Path(ruta).name] = {'huella': huella, 'bytes': Path(ruta).stat().st_size}
+
+    def guardar(self):
+        """Escribe el manifiesto y lo registra como la última ejecución del origen"""
+        try:
+            _escribir_json(self.ruta, {'origen': self.origen, 'certificados': self.certificados})
+            _escribir_json(_ruta_indice(self.origen), {'origen': self.origen,
+                                                       'manifiesto': str(self.ruta.resolve())})
+        except Exception as e:
+            print(f"No se pudo guardar el manifiesto: {str(e)}")
+
+def reutilizar_archivo(origen, destino):
+    """Enlaza (hard link) el archivo anterior en la nueva carpeta o lo copia si no se puede"""
+    try:
+        os.link(origen, destino)
+    except OSError:
+        shutil.copy2(origen, destino)
+
+def _ruta_indice(origen):
+    # Un archivo pequeño por PDF de origen para que varios procesos no se pisen
+    clave = hashlib.sha1(str(Path(origen).resolve()).encode('utf-8')).hexdigest()
+    return Path(CACHE_DIR) / "ejecuciones" / f"{clave}.json"
+
+def _escribir_json(ruta, datos):
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_suffix(".tmp")
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, ensure_ascii=False)
+    os.replace(temporal, ruta)
@@ -1,8 +1,100 @@
 # core/pdf_processor.py
 import PyPDF2
 import json
+import mmap
+import os
+import shutil
+from collections import OrderedDict
+from collections.abc import Mapping
 from pathlib import Path
 from datetime import datetime
+from core.cache_campos import obtener_cache
+from core.instrumentacion import contar, etapa
+from config import PDF_ACTUALIZACION_INCREMENTAL, PDF_LECTURA_MMAP
+
+PREFIJOS_CAMPOS = ('A_', 'B_', 'C_', 'D_')
+
+# Lectores ya analizados: ruta -> (firma del archivo, lector, campos)
+_lectores = OrderedDict()
+_MAX_LECTORES = 8
+
+class CamposFormulario(Mapping):
+    """Campos de texto del formulario (nombre /T -> valor) que se leen al accederlos"""
+    def __init__(self, campos):
+        self._campos = campos  # nombre -> (diccionario del campo, referencia indirecta o None)
+
+    def __getitem__(self, nombre):
+        valor = self._campos[nombre][0].get("/V")
+        return valor.get_object() if valor is not None else None
+
+    def __iter__(self):
+        return iter(self._campos)
+
+    def __len__(self):
+        return len(self._campos)
+
+    def campo(self, nombre):
+        """Devuelve el diccionario del campo en el PDF"""
+        return self._campos[nombre][0]
+
+    def referencia(self, nombre):
+        """Devuelve la referencia indirecta del campo (None si es un objeto directo)"""
+        return self._campos[nombre][1]
+
+def _recorrer_campos(referencias, campos, tipo_padre=None, visitados=None):
+    """Recorre el árbol AcroForm guardando solo los campos de texto con prefijo conocido"""
+    if visitados is None:
+        visitados = set()
+    for referencia in referencias:
+        campo = referencia.get_object()
+        if id(campo) in visitados:
+            continue
+        visitados.add(id(campo))
+        tipo = campo.get("/FT", tipo_padre)
+        nombre = campo.get("/T")
+        if isinstance(nombre, str) and nombre.startswith(PREFIJOS_CAMPOS) and tipo == "/Tx":
+            es_indirecto = isinstance(referencia, PyPDF2.generic.IndirectObject)
+            campos[nombre] = (campo, referencia if es_indirecto else None)
+        if "/Kids" in campo:
+            _recorrer_campos(campo["/Kids"], campos, tipo, visitados)
+
+def _abrir_flujo(ruta_pdf, usar_mmap):
+    """Devuelve la entrada para PdfReader: la ruta (copia en memoria) o un mmap de solo lectura.
+
+    Con mmap no se copia el archivo entero; PyPDF2 lee directamente de las
+    páginas de la caché del sistema, que comparten todos los lectores del lote.
+    """
+    if usar_mmap:
+        with open(ruta_pdf, 'rb') as archivo:
+            if os.fstat(archivo.fileno()).st_size:
+                return mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+    return ruta_pdf
+
+def abrir_pdf(ruta_pdf, usar_mmap=None):
+    """Analiza el PDF una sola vez y devuelve (lector, campos) reutilizando la caché
+    mientras el archivo no cambie de tamaño ni de fecha de modificación"""
+    if usar_mmap is None:
+        usar_mmap = PDF_LECTURA_MMAP
+    clave = str(Path(ruta_pdf).resolve())
+    estado = os.stat(clave)
+    firma = (estado.st_mtime_ns, estado.st_size)
+
+    cacheado = _lectores.get(clave)
+    if cacheado and cacheado[0] == firma:
+        _lectores.move_to_end(clave)
+        return cacheado[1], cacheado[2]
+
+    lector = PyPDF2.PdfReader(_abrir_flujo(clave, usar_mmap))
+    campos = {}
+    raiz = lector.trailer["/Root"]
+    if "/AcroForm" in raiz and "/Fields" in raiz["/AcroForm"]:
+        _recorrer_campos(raiz["/AcroForm"]["/Fields"], campos)
+    campos = CamposFormulario(campos)
+
+    _lectores[clave] = (firma, lector, campos)
+    if len(_lectores) > _MAX_LECTORES:
+        _lectores.popitem(last=False)
+    return lector, campos
 
 def procesar_campos_pdf(campos):
     """Filtra y limpia los campos del PDF"""
@@ -14,76 +106,196 @@ def procesar_campos_pdf(campos):
                 datos_limpios[nombre_limpio] = str(valor_campo).strip()
     return datos_limpios
 
-def leer_campos_pdf(ruta_pdf):
+def leer_campos_pdf(ruta_pdf, usar_cache=True):
     """Lee los campos del PDF y devuelve un diccionario"""
     try:
-        with open(ruta_pdf, 'rb') as archivo:
-            lector_pdf = PyPDF2.PdfReader(archivo)
-            if not lector_pdf.get_form_text_fields():
-                print(f"No se encontraron campos en '{ruta_pdf}'")
-                return None
-            return procesar_campos_pdf(lector_pdf.get_form_text_fields())
+        if usar_cache:
+            cache = obtener_cache()
+            clave = cache.clave(ruta_pdf)
+            datos = cache.obtener(clave)
+            if datos:
+                contar("cache_campos_aciertos")
+                return datos
+            contar("cache_campos_fallos")
+
+        with etapa("lectura_pdf"):
+            _, campos = abrir_pdf(ruta_pdf)
+        if not campos:
+            print(f"No se encontraron campos en '{ruta_pdf}'")
+            return None
+        with etapa("campos"):
+            datos = procesar_campos_pdf(campos)
+
+        if usar_cache:
+            cache.guardar(clave, datos)
+        return datos
     except Exception as e:
         print(f"Error al leer PDF: {str(e)}")
         return None
 
-def procesar_pdf(ruta_original, datos_actualizados, output_dir):
-    """Procesa un PDF, actualiza campos relevantes usando los nombres exactos y guarda copia modificada"""
+def procesar_pdf(ruta_original, datos_actualizados, output_dir, incremental=None):
+    """Procesa un PDF, actualiza campos relevantes usando los nombres exactos y guarda copia modificada.
+
+    En modo incremental la copia es el PDF original más una actualización
+    incremental con solo los campos modificados y una nueva tabla xref.
+    """
+    if incremental is None:
+        incremental = PDF_ACTUALIZACION_INCREMENTAL
     try:
         # Crear ruta de salida
         nombre_archivo = Path(ruta_original).stem
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         ruta_modificado = output_dir / f"{nombre_archivo}_modificado_{timestamp}.pdf"
 
-        # Leer PDF original
-        with open(ruta_original, 'rb') as archivo_entrada:
-            lector = PyPDF2.PdfReader(archivo_entrada)
-            escritor = PyPDF2.PdfWriter()
-
-            # Copiar todas las páginas
-            for pagina in lector.pages:
-                escritor.add_page(pagina)
-
-            # Copiar el diccionario de formularios (AcroForm) si existe
-            if "/AcroForm" in lector.trailer["/Root"]:
-                escritor._root_object.update({
-                    PyPDF2.generic.NameObject("/AcroForm"): lector.trailer["/Root"]["/AcroForm"]
-                })
-
-            # Obtener los nombres exactos de los campos del PDF (con [0])
-            campos_pdf = lector.get_form_text_fields()
-            cambios = {}
-
-            # Mapear campos relevantes a los nombres exactos del PDF
-            mapeo = {
-                "A_INSTR": "A_INSTR[0]",
-                "A_DNI": "A_DNI[0]",
-                "B_NOMEMB": "B_NOMEMB[0]",
-                "B_MATRICULA": "B_MATRICULA[0]",
-                "B_PANTALAN": "B_PANTALAN[0]",
-                "B_AMARRE": "B_AMARRE[0]",
-                "B_POTENCIA": "B_POTENCIA[0]",
-                "B_ESLORA": "B_ESLORA[0]",
-                "B_INSTAL": "B_INSTAL[0]"
-            }
-
-            for clave, nombre_pdf in mapeo.items():
-                if nombre_pdf in campos_pdf and clave in datos_actualizados:
-                    cambios[nombre_pdf] = str(datos_actualizados[clave])
-
-            # Actualizar los campos en el PDF si hay cambios
-            if cambios:
-                escritor.update_page_form_field_values(
-                    escritor.pages[0],
-                    cambios
-                )
-
-            # Guardar PDF modificado
-            with open(ruta_modificado, 'wb') as archivo_salida:
-                escritor.write(archivo_salida)
+        # Leer PDF original (reutiliza el análisis hecho al cargar los campos)
+        lector, campos_pdf = abrir_pdf(ruta_original)
+
+        # Mapear campos relevantes a los nombres exactos del PDF (campos_pdf, con [0])
+        cambios = {}
+        mapeo = {
+            "A_INSTR": "A_INSTR[0]",
+            "A_DNI": "A_DNI[0]",
+            "B_NOMEMB": "B_NOMEMB[0]",
+            "B_MATRICULA": "B_MATRICULA[0]",
+            "B_PANTALAN": "B_PANTALAN[0]",
+            "B_AMARRE": "B_AMARRE[0]",
+            "B_POTENCIA": "B_POTENCIA[0]",
+            "B_ESLORA": "B_ESLORA[0]",
+            "B_INSTAL": "B_INSTAL[0]"
+        }
+
+        for clave, nombre_pdf in mapeo.items():
+            if nombre_pdf in campos_pdf and clave in datos_actualizados:
+                cambios[nombre_pdf] = str(datos_actualizados[clave])
+
+        if incremental and not lector.is_encrypted:
+            try:
+                escribir_actualizacion_incremental(ruta_original, ruta_modificado, lector, campos_pdf, cambios)
+                return str(ruta_modificado)
+            except Exception as e:
+                print(f"Actualización incremental no posible, se reescribe el PDF: {str(e)}")
+
+        escritor = PyPDF2.PdfWriter()
+
+        # Copiar todas las páginas
+        for pagina in lector.pages:
+            escritor.add_page(pagina)
+
+        # Copiar el diccionario de formularios (AcroForm) si existe
+        if "/AcroForm" in lector.trailer["/Root"]:
+            escritor._root_object.update({
+                PyPDF2.generic.NameObject("/AcroForm"): lector.trailer["/Root"]["/AcroForm"]
+            })
+
+        # Actualizar los campos en el PDF si hay cambios (en cualquier página)
+        if cambios:
+            for pagina in escritor.pages:
+                if "/Annots" in pagina:
+                    escritor.update_page_form_field_values(pagina, cambios)
+
+        # Guardar PDF modificado
+        with open(ruta_modificado, 'wb') as archivo_salida:
+            escritor.write(archivo_salida)
 
         return str(ruta_modificado)
 
     except Exception as e:
         print(f"Error al procesar PDF: {str(e)}")
         return None
+
+def _posicion_xref(ruta_pdf):
+    """Lee el valor de startxref al final del PDF"""
+    with open(ruta_pdf, 'rb') as archivo:
+        archivo.seek(0, os.SEEK_END)
+        tamano = archivo.tell()
+        archivo.seek(max(0, tamano - 2048))
+        cola = archivo.read()
+    posicion = cola.rfind(b"startxref")
+    if posicion < 0:
+        raise ValueError("startxref no encontrado")
+    return int(cola[posicion + 9:].split()[0])
+
+def escribir_actualizacion_incremental(ruta_original, ruta_salida, lector, campos_pdf, cambios):
+    """Copia el PDF original y le añade solo los objetos de campo modificados.
+
+    Los objetos del lector no se modifican (están en caché); se escriben
+    copias con el nuevo /V y /NeedAppearances activado en el AcroForm.
+    """
+    from PyPDF2.generic import (
+        DictionaryObject, NameObject, NumberObject, TextStringObject, BooleanObject
+    )
+
+    # Objetos a reescribir: número de objeto -> (generación, objeto)
+    objetos = {}
+    for nombre_pdf, valor in cambios.items():
+        referencia = campos_pdf.referencia(nombre_pdf)
+        if referencia is None:
+            raise ValueError(f"El campo {nombre_pdf} no es un objeto indirecto")
+        campo = DictionaryObject(campos_pdf.campo(nombre_pdf))
+        campo[NameObject("/V")] = TextStringObject(valor)
+        objetos[referencia.idnum] = (referencia.generation, campo)
+
+    # Pedir al visor que regenere la apariencia de los campos
+    trailer = lector.trailer
+    raiz_ref = trailer.raw_get("/Root")
+    raiz = trailer["/Root"]
+    if cambios and "/AcroForm" in raiz:
+        acroform_ref = raiz.raw_get("/AcroForm")
+        acroform = DictionaryObject(raiz["/AcroForm"])
+        acroform[NameObject("/NeedAppearances")] = BooleanObject(True)
+        if isinstance(acroform_ref, PyPDF2.generic.IndirectObject):
+            objetos[acroform_ref.idnum] = (acroform_ref.generation, acroform)
+        else:
+            nueva_raiz = DictionaryObject(raiz)
+            nueva_raiz[NameObject("/AcroForm")] = acroform
+            objetos[raiz_ref.idnum] = (raiz_ref.generation, nueva_raiz)
+
+    xref_anterior = _posicion_xref(ruta_original)
+    shutil.copyfile(ruta_original, ruta_salida)
+    if not objetos:
+        return
+
+    with open(ruta_salida, 'r+b') as salida:
+        salida.seek(0, os.SEEK_END)
+        salida.seek(salida.tell() - 1)
+        if salida.read(1) not in (b"\n", b"\r"):
+            salida.write(b"\n")
+
+        posiciones = {}
+        for idnum in sorted(objetos):
+            generacion, objeto = objetos[idnum]
+            posiciones[idnum] = (salida.tell(), generacion)
+            salida.write(f"{idnum} {generacion} obj\n".encode())
+            objeto.write_to_stream(salida, None)
+            salida.write(b"\nendobj\n")
+
+        # Nueva sección xref con subsecciones de números consecutivos; empieza
+        # por la entrada libre 0 como hacen otros editores (algunos lectores la esperan)
+        inicio_xref = salida.tell()
+        salida.write(b"xref\n0 1\n0000000000 65535 f \n")
+        numeros = sorted(posiciones)
+        grupo = [numeros[0]]
+        for idnum in numeros[1:] + [None]:
+            if idnum is not None and idnum == grupo[-1] + 1:
+                grupo.append(idnum)
+                continue
+            salida.write(f"{grupo[0]} {len(grupo)}\n".encode())
+            for numero in grupo:
+                posicion, generacion = posiciones[numero]
+                salida.write(f"{posicion:010d} {generacion:05d} n \n".encode())
+            if idnum is not None:
+                grupo = [idnum]
+
+        # Con tablas xref en stream el /Size no siempre llega al trailer del lector
+        existentes = [n for tabla in lector.xref.values() for n in tabla] + list(lector.xref_objStm)
+        tamano = max([int(trailer.get("/Size", 0)), numeros[-1] + 1] + [n + 1 for n in existentes])
+        nuevo_trailer = DictionaryObject()
+        nuevo_trailer[NameObject("/Size")] = NumberObject(tamano)
+        nuevo_trailer[NameObject("/Root")] = raiz_ref
+        nuevo_trailer[NameObject("/Prev")] = NumberObject(xref_anterior)
+        for clave in ("/Info", "/ID"):
+            if clave in trailer:
+                nuevo_trailer[NameObject(clave)] = trailer.raw_get(clave)
+        salida.write(b"trailer\n")
+        nuevo_trailer.write_to_stream(salida, None)
+        salida.write(f"\nstartxref\n{inicio_xref}\n%%EOF\n".encode())
@@ -0,0 +1,227 @@
+# core/pipeline.py
+import time
+from pathlib import Path
+from datetime import datetime
+from core.pdf_processor import leer_campos_pdf, procesar_pdf
+from core.certificate_builder import generar_certificados
+from core.report_generator import generar_reporte_estudiantes
+from core.catalogo import RUTA_DATOS, obtener_catalogo
+from core.instrumentacion import Medicion, etapa
+from core.listado import ListadoFormulario, abrir_listado, como_estudiante
+from core.registro import RegistroCertificados
+from config import REGISTRO_CERTIFICADOS
+
+def seleccionar_datos(datos_pdf, instructor=None, barco=None, ruta_datos=RUTA_DATOS):
+    """Copia de los datos del PDF con el instructor y el barco elegidos, sin mensajes.
+
+    El instructor es el dict del catálogo; el barco se busca por nombre o
+    matrícula (un barco que no está en el catálogo no cambia nada).
+    """
+    datos = datos_pdf.copy()
+    if instructor:
+        datos['A_INSTR'] = instructor['nombre']
+        datos['A_DNI'] = instructor['dni']
+    if barco and barco.strip():
+        barco_obj = obtener_catalogo(ruta_datos).barco(barco)
+        if barco_obj:
+            datos['B_NOMEMB'] = barco_obj['nombre']
+            datos['B_MATRICULA'] = barco_obj['matricula']
+            datos['B_PANTALAN'] = barco_obj['pantalan']
+            datos['B_AMARRE'] = barco_obj['amarre']
+            datos['B_POTENCIA'] = barco_obj['potencia']
+            datos['B_ESLORA'] = barco_obj['eslora']
+            datos['B_INSTAL'] = barco_obj['instalacion']
+    return datos
+
+def aplicar_selecciones(datos_pdf, instructor=None, barco=None, ruta_datos=RUTA_DATOS):
+    """Devuelve una copia de los datos del PDF con el instructor y el barco elegidos"""
+    try:
+        datos_pdf_actualizados = seleccionar_datos(datos_pdf, instructor, barco, ruta_datos)
+    except Exception as e:
+        print(f"Error cargando datos del barco: {e}")
+        datos_pdf_actualizados = seleccionar_datos(datos_pdf, instructor, None, ruta_datos)
+
+    if instructor:
+        print(f"DEBUG: Instructor actualizado - {instructor['nombre']} (DNI: {instructor['dni']})")
+
+    # DEBUG: Mostrar campos modificados
+    print("\n=== CAMPOS ACTUALIZADOS ===")
+    print(f"A_INSTR: {datos_pdf_actualizados.get('A_INSTR', 'No modificado')}")
+    print(f"B_NOMEMB: {datos_pdf_actualizados.get('B_NOMEMB', 'No modificado')}")
+    print("===========================\n")
+
+    return datos_pdf_actualizados
+
+def extraer_estudiantes(datos_pdf):
+    """Devuelve el listado de estudiantes de los pares D_i / D_i+1 del formulario"""
+    return ListadoFormulario(datos_pdf)
+
+def ejecutar_generacion(pdf_path, datos_pdf, output_dir=None, logo_path=Path("aliboat logo.png"),
+                        estado=None, progreso=None, cancelado=None, medicion=None, listado=None,
+                        archivo=None):
+    """Guarda el PDF modificado y genera certificados y reporte.
+
+    estado(texto) recibe los mensajes de cada etapa, progreso(hechos, total)
+    avanza con cada certificado y cancelado() se consulta entre etapas y
+    entre certificados. Devuelve un diccionario con lo generado.
+
+    listado (core.listado) sustituye a los estudiantes del formulario; se
+    recorre una vez para los certificados y otra para el reporte, que en ese
+    caso siempre es paginado. archivo ("zip" o "tar") guarda los certificados
+    en un único archivo en lugar de PDFs sueltos (por defecto, según config).
+
+    Con REGISTRO_CERTIFICADOS los certificados emitidos se anotan en el
+    registro SQLite; antes de generarlos se avisa de los estudiantes que ya
+    tienen certificado para la misma fecha de práctica (resultado['duplicados']).
+
+    Los tiempos de cada etapa se anotan en medicion (una nueva si no se pasa,
+    p. ej. la que ya midió la lectura del PDF) y se guardan en
+    instrumentacion.json dentro de la carpeta de salida.
+    """
+    def avisar(texto):
+        if estado:
+            estado(texto)
+
+    # Crear carpeta de salida
+    if output_dir is None:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_dir = Path("output") / timestamp
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    if medicion is None:
+        medicion = Medicion()
+    with medicion:
+        resultado = _generar(pdf_path, datos_pdf, output_dir, logo_path, avisar, progreso, cancelado,
+                             listado, archivo)
+    try:
+        resultado['instrumentacion'] = medicion.guardar(output_dir)
+    except Exception as e:
+        print(f"Error al guardar la instrumentación: {e}")
+    return resultado
+
+def generar_desde_pdf(ruta_pdf, output_dir, instructor=None, barco=None, ruta_datos=RUTA_DATOS,
+                      logo_path="aliboat logo.png", perfil=None, ruta_listado=None, archivo=None,
+                      datos_pdf=None, cancelado=None):
+    """Lee el PDF de prácticas, aplica instructor y barco y ejecuta todo el pipeline.
+
+    Es la unidad de trabajo del modo por lotes y del servicio de renderizado:
+    recibe solo rutas y valores simples y devuelve un resumen serializable
+    (rutas como texto) en lugar de lanzar excepciones. Si se pasan datos_pdf
+    (ya leídos y con las selecciones aplicadas) no se vuelve a leer el PDF.
+    cancelado() se consulta igual que en ejecutar_generacion.
+    """
+    inicio = time.perf_counter()
+    medicion = Medicion(perfil)
+    if datos_pdf is None:
+        with medicion:
+            datos_pdf = leer_campos_pdf(ruta_pdf)
+        if not datos_pdf:
+            return {'pdf': str(ruta_pdf), 'error': "No se pudieron leer los campos", 'certificados': [],
+                    'segundos': time.perf_counter() - inicio}
+        # seleccionar_datos y no aplicar_selecciones: sin mensajes en la salida de lotes y servicio
+        try:
+            datos_pdf = seleccionar_datos(datos_pdf, instructor, barco, ruta_datos)
+        except Exception as e:
+            return {'pdf': str(ruta_pdf), 'error': f"Error cargando datos del barco: {e}", 'certificados': [],
+                    'segundos': time.perf_counter() - inicio}
+    try:
+        listado = abrir_listado(ruta_listado) if ruta_listado else None
+        resultado = ejecutar_generacion(ruta_pdf, datos_pdf, Path(output_dir), Path(logo_path),
+                                        cancelado=cancelado, medicion=medicion, listado=listado,
+                                        archivo=archivo)
+    except Exception as e:
+        return {'pdf': str(ruta_pdf), 'error': str(e), 'certificados': [],
+                'segundos': time.perf_counter() - inicio}
+    return {
+        'pdf': str(ruta_pdf),
+        'error': None,
+        'output_dir': str(resultado['output_dir']),
+        'certificados': [str(ruta) for ruta in resultado['certificados']],
+        'reporte': str(resultado['reporte']) if resultado['reporte'] else None,
+        'errores': resultado['errores'],
+        'duplicados': resultado['duplicados'],
+        'cancelado': resultado['cancelado'],
+        'segundos': time.perf_counter() - inicio,
+    }
+
+def _generar(pdf_path, datos_pdf, output_dir, logo_path, avisar, progreso, cancelado, listado, archivo):
+    resultado = {
+        'output_dir': output_dir,
+        'pdf_modificado': None,
+        'certificados': [],
+        'errores': [],
+        'reporte': None,
+        'cancelado': False,
+        'instrumentacion': None,
+        'duplicados': [],
+    }
+
+    # Guardar PDF modificado
+    avisar("Generando documentos...")
+    with etapa("reescritura_formulario"):
+        resultado['pdf_modificado'] = procesar_pdf(pdf_path, datos_pdf, output_dir)
+    if resultado['pdf_modificado']:
+        avisar(f"PDF modificado guardado: {Path(resultado['pdf_modificado']).name}")
+
+    registro = _abrir_registro()
+    try:
+        if registro is not None:
+            resultado['duplicados'] = _avisar_duplicados(registro, datos_pdf, listado, avisar, pdf_path)
+
+        # Generar certificados
+        if not (cancelado and cancelado()):
+            with etapa("certificados"):
+                resultado['certificados'] = generar_certificados(
+                    datos_pdf, output_dir, logo_path,
+                    errores=resultado['errores'], progreso=progreso, cancelado=cancelado,
+                    origen=pdf_path, estudiantes=listado, archivo=archivo, registro=registro
+                )
+    finally:
+        if registro is not None:
+            registro.cerrar()
+
+    if cancelado and cancelado():
+        resultado['cancelado'] = True
+        avisar("Generación cancelada")
+        return resultado
+
+    # Generar reporte
+    avisar("Generando reporte Excel...")
+    if listado is None:
+        estudiantes, paginado = extraer_estudiantes(datos_pdf), None
+    else:
+        # Un listado largo no cabe en la página única que crece con cada fila
+        estudiantes, paginado = listado, True
+    with etapa("reporte"):
+        resultado['reporte'] = generar_reporte_estudiantes(datos_pdf, estudiantes, output_dir, paginado)
+
+    avisar(f"Documentos generados en: {output_dir}")
+    return resultado
+
+def _abrir_registro():
+    """Registro de certificados configurado (None si está desactivado o no se puede abrir)"""
+    if not REGISTRO_CERTIFICADOS:
+        return None
+    try:
+        return RegistroCertificados(REGISTRO_CERTIFICADOS)
+    except Exception as e:
+        print(f"No se pudo abrir el registro de certificados: {e}")
+        return None
+
+def _avisar_duplicados(registro, datos_pdf, listado, avisar, origen):
+    """Avisa de los estudiantes que ya tienen certificado para esta fecha de práctica
+    emitido desde otro PDF"""
+    estudiantes = listado if listado is not None else extraer_estudiantes(datos_pdf)
+    try:
+        with etapa("registro_duplicados"):
+            encontrados = registro.duplicados((como_estudiante(e) for e in estudiantes),
+                                              datos_pdf.get('C_1'), origen)
+    except Exception as e:
+        print(f"No se pudo consultar el registro de certificados: {e}")
+        return []
+    duplicados = [(estudiante.dni, estudiante.nombre_completo, fila['ruta']) for estudiante, fila in encontrados]
+    for dni, nombre, ruta in duplicados:
+        print(f"AVISO: {nombre} (DNI {dni}) ya tiene certificado de esta práctica: {ruta}")
+    if duplicados:
+        avisar(f"Aviso: {len(duplicados)} estudiantes ya tenían certificado de esta fecha")
+    return duplicados
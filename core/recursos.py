@@ -0,0 +1,155 @@
+# core/recursos.py
+import hashlib
+import io
+import os
+import zlib
+from pathlib import Path
+from reportlab.pdfbase.pdfdoc import PDFImageXObject
+from reportlab.platypus.flowables import Flowable
+from config import CACHE_DIR, LOGO_DPI
+
+# Imágenes ya preparadas en este proceso: (ruta, mtime, tamaño, ancho, alto, dpi, guardar) -> datos
+_imagenes = {}
+
+# Si los internos de ReportLab que usa ImagenImpresion funcionan (None = sin comprobar)
+_dibujo_directo = None
+
+# ImageReader por imagen para el dibujo de reserva con canvas.drawImage
+_lectores = {}
+
+class ImagenImpresion(Flowable):
+    """Imagen rasterizada a su resolución de impresión y comprimida una sola vez.
+
+    A diferencia de platypus.Image, no vuelve a leer, decodificar ni
+    comprimir el archivo en cada documento: el flujo Flate ya preparado se
+    añade tal cual como XObject. Para eso usa atributos internos de ReportLab;
+    si en la versión instalada no funcionan se dibuja con canvas.drawImage.
+    """
+    def __init__(self, width, height, pixeles, flujo, nombre):
+        Flowable.__init__(self)
+        self.width = width
+        self.height = height
+        self.pixeles = pixeles
+        self.flujo = flujo
+        self.nombre = nombre
+
+    def draw(self):
+        if dibujo_directo_disponible():
+            self._dibujar_xobject()
+        else:
+            self._dibujar_imagen()
+
+    def _dibujar_xobject(self):
+        # Mismo registro que canvas.drawImage, pero con el flujo ya codificado
+        canv = self.canv
+        documento = canv._doc
+        nombre_registro = documento.getXObjectName(self.nombre)
+        if nombre_registro not in documento.idToObject:
+            imagen = PDFImageXObject(self.nombre)
+            imagen.width, imagen.height = self.pixeles
+            imagen.bitsPerComponent = 8
+            imagen.colorSpace = 'DeviceRGB'
+            imagen._filters = ('FlateDecode',)
+            imagen.streamContent = self.flujo
+            imagen.mask = None
+            canv._setXObjects(imagen)
+            documento.Reference(imagen, nombre_registro)
+            documento.addForm(self.nombre, imagen)
+        canv._currentPageHasImages = 1
+        canv.saveState()
+        canv.scale(self.width, self.height)
+        canv._code.append(f"/{nombre_registro} Do")
+        canv.restoreState()
+        canv._formsinuse.append(self.nombre)
+
+    def _dibujar_imagen(self):
+        lector = _lectores.get(self.nombre)
+        if lector is None:
+            from PIL import Image as PILImage
+            from reportlab.lib.utils import ImageReader
+            lector = ImageReader(PILImage.frombytes('RGB', self.pixeles, zlib.decompress(self.flujo)))
+            _lectores[self.nombre] = lector
+        self.canv.drawImage(lector, 0, 0, self.width, self.height)
+
+def dibujo_directo_disponible():
+    """Comprueba una vez por proceso que el dibujo directo del XObject funciona
+    con la ReportLab instalada (dibujando una imagen de 1 píxel)"""
+    global _dibujo_directo
+    if _dibujo_directo is None:
+        try:
+            from reportlab.pdfgen.canvas import Canvas
+            salida = io.BytesIO()
+            canv = Canvas(salida, pageCompression=0)
+            prueba = ImagenImpresion(1, 1, (1, 1), zlib.compress(b"\xff\xff\xff"), "imgprueba")
+            prueba.canv = canv
+            prueba._dibujar_xobject()
+            canv.showPage()
+            canv.save()
+            _dibujo_directo = b"imgprueba Do" in salida.getvalue()
+        except Exception as e:
+            print(f"Dibujo directo de imágenes no disponible en esta ReportLab: {str(e)}")
+            _dibujo_directo = False
+    return _dibujo_directo
+
+def imagen_impresion(ruta, width, height, dpi=None, guardar=True):
+    """Devuelve la imagen preparada para imprimirse a width x height puntos.
+
+    Se aplana sobre fondo blanco, se reduce (nunca se amplía) a la resolución
+    de impresión y se comprime una vez; el resultado se guarda en la carpeta
+    de caché con clave hash del archivo + tamaño en píxeles + DPI para
+    reutilizarlo entre ejecuciones (con guardar=False solo se lee de ella).
+    Devuelve None si no se puede preparar.
+    """
+    if dpi is None:
+        dpi = LOGO_DPI
+    try:
+        ruta = Path(ruta).resolve()
+        estado = os.stat(ruta)
+        # guardar forma parte de la clave: una imagen preparada sin guardar (vista
+        # previa) no debe impedir que el lote la escriba en la caché en disco
+        clave_proceso = (str(ruta), estado.st_mtime_ns, estado.st_size, width, height, dpi, guardar)
+        if clave_proceso not in _imagenes:
+            _imagenes[clave_proceso] = _preparar(ruta, width, height, dpi, guardar)
+        pixeles, flujo, nombre = _imagenes[clave_proceso]
+    except Exception as e:
+        print(f"No se pudo preparar la imagen {ruta}: {str(e)}")
+        return None
+    return ImagenImpresion(width, height, pixeles, flujo, nombre)
+
+def _preparar(ruta, width, height, dpi, guardar=True):
+    """Carga la imagen de la caché en disco o la rasteriza y la guarda"""
+    with open(ruta, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:16]
+
+    from PIL import Image as PILImage
+    with PILImage.open(ruta) as original:
+        # Tamaño de impresión en píxeles, sin superar el de la imagen original
+        ancho_px = min(original.width, max(1, round(width / 72 * dpi)))
+        alto_px = min(original.height, max(1, round(height / 72 * dpi)))
+        clave = f"{digest}_{ancho_px}x{alto_px}_{dpi}"
+        archivo = Path(CACHE_DIR) / "imagenes" / f"{clave}.bin"
+        try:
+            with open(archivo, 'rb') as f:
+                return (ancho_px, alto_px), f.read(), f"img{clave}"
+        except FileNotFoundError:
+            pass
+
+        imagen = original.convert('RGBA')
+    # Aplanar sobre blanco (el certificado es blanco) para no necesitar SMask
+    fondo = PILImage.new('RGB', imagen.size, (255, 255, 255))
+    fondo.paste(imagen, mask=imagen.getchannel('A'))
+    if fondo.size != (ancho_px, alto_px):
+        fondo = fondo.resize((ancho_px, alto_px), PILImage.LANCZOS)
+    flujo = zlib.compress(fondo.tobytes(), 9)
+    if not guardar:
+        return (ancho_px, alto_px), flujo, f"img{clave}"
+
+    try:
+        archivo.parent.mkdir(parents=True, exist_ok=True)
+        temporal = archivo.with_name(f"{archivo.name}.{os.getpid()}.tmp")
+        with open(temporal, 'wb') as f:
+            f.write(flujo)
+        os.replace(temporal, archivo)
+    except Exception as e:
+        print(f"No se pudo guardar la imagen en caché: {str(e)}")
+    return (ancho_px, alto_px), flujo, f"img{clave}"
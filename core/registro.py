@@ -0,0 +1,191 @@
+# core/registro.py
+import hashlib
+import shutil
+import sqlite3
+import tarfile
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from config import REGISTRO_CERTIFICADOS
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS certificados (
+    id INTEGER PRIMARY KEY,
+    dni TEXT NOT NULL,
+    dni_clave TEXT NOT NULL,
+    nombre TEXT NOT NULL,
+    barco TEXT,
+    matricula TEXT,
+    instructor TEXT,
+    fecha TEXT NOT NULL,
+    ruta TEXT NOT NULL,
+    huella TEXT,
+    origen TEXT,
+    emitido TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS certificados_dni ON certificados (dni_clave, fecha);
+CREATE INDEX IF NOT EXISTS certificados_fecha ON certificados (fecha);
+"""
+
+_COLUMNAS = "id, dni, nombre, barco, matricula, instructor, fecha, ruta, huella, origen, emitido"
+
+def clave_dni(dni):
+    """DNI sin espacios, guiones ni puntos y en mayúsculas para comparar"""
+    return ''.join(c for c in str(dni or '') if c.isalnum()).upper()
+
+def fecha_iso(fecha):
+    """Convierte dd/mm/yyyy en yyyy-mm-dd (ordenable); otros formatos se guardan tal cual"""
+    try:
+        return datetime.strptime(str(fecha).strip(), "%d/%m/%Y").strftime("%Y-%m-%d")
+    except ValueError:
+        return str(fecha or '').strip()
+
+def _ruta_origen(origen):
+    """Ruta absoluta del PDF de prácticas para comparar ejecuciones (None si no hay)"""
+    return str(Path(origen).resolve()) if origen else None
+
+def huella_archivo(ruta):
+    """SHA-256 del contenido de un certificado ya guardado"""
+    return hashlib.sha256(leer_certificado(ruta)).hexdigest()
+
+def leer_certificado(ruta):
+    """Bytes de un certificado, también si es una entrada de un ZIP/tar (archivo/PDFs/x.pdf)"""
+    ruta = Path(ruta)
+    if ruta.is_file():
+        return ruta.read_bytes()
+    for contenedor in ruta.parents:
+        if contenedor.is_file():
+            entrada = ruta.relative_to(contenedor).as_posix()
+            if zipfile.is_zipfile(contenedor):
+                with zipfile.ZipFile(contenedor) as z:
+                    return z.read(entrada)
+            with tarfile.open(contenedor) as t:
+                return t.extractfile(entrada).read()
+    raise FileNotFoundError(f"No existe el certificado {ruta}")
+
+class RegistroCertificados:
+    """Registro SQLite de los certificados emitidos en todas las ejecuciones.
+
+    Guarda DNI, nombre, barco, instructor, fecha de la práctica, ruta y hash
+    de cada certificado. Los índices por DNI (con fecha) y por fecha hacen
+    que buscar, detectar duplicados y reimprimir no dependa del tamaño del
+    historial. Varios procesos pueden usarlo a la vez; se deja el diario
+    por defecto de SQLite (WAL no funciona en carpetas de red).
+    """
+    def __init__(self, ruta=None):
+        self.ruta = Path(ruta or REGISTRO_CERTIFICADOS)
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        self.conexion = sqlite3.connect(str(self.ruta), timeout=30)
+        self.conexion.row_factory = sqlite3.Row
+        self.conexion.executescript(_ESQUEMA)
+
+    def cerrar(self):
+        self.conexion.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def anotar(self, datos_generales, certificados, origen=None):
+        """Registra en una sola transacción una lista de (datos_estudiante, ruta, huella).
+
+        Si la huella es None se calcula leyendo el archivo guardado. Un
+        certificado idéntico ya registrado (mismo DNI, fecha, origen y hash)
+        no se duplica: solo se actualizan su ruta y su fecha de emisión.
+        Devuelve el número de certificados nuevos.
+        """
+        emitido = datetime.now().isoformat(timespec='seconds')
+        fecha = fecha_iso(datos_generales.get('C_1'))
+        filas = []
+        for datos_estudiante, ruta, huella in certificados:
+            if huella is None:
+                try:
+                    huella = huella_archivo(ruta)
+                except (OSError, KeyError) as e:
+                    print(f"No se pudo calcular el hash de {ruta}: {str(e)}")
+            filas.append((
+                datos_estudiante['dni'], clave_dni(datos_estudiante['dni']), datos_estudiante['nombre'],
+                datos_generales.get('B_NOMEMB'), datos_generales.get('B_MATRICULA'),
+                datos_generales.get('A_INSTR'), fecha, str(Path(ruta).resolve()), huella,
+                _ruta_origen(origen), emitido,
+            ))
+        nuevos = 0
+        with self.conexion:
+            for fila in filas:
+                _, clave, _, _, _, _, fecha, ruta, huella, origen, emitido = fila
+                actualizados = self.conexion.execute(
+                    "UPDATE certificados SET ruta = ?, emitido = ? WHERE dni_clave = ? AND fecha = ?"
+                    " AND origen IS ? AND huella IS ?", (ruta, emitido, clave, fecha, origen, huella)).rowcount
+                if not actualizados:
+                    self.conexion.execute(
+                        "INSERT INTO certificados (dni, dni_clave, nombre, barco, matricula, instructor, fecha,"
+                        " ruta, huella, origen, emitido) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", fila)
+                    nuevos += 1
+        return nuevos
+
+    def por_dni(self, dni):
+        """Certificados de un DNI, del más reciente al más antiguo"""
+        return self.conexion.execute(
+            f"SELECT {_COLUMNAS} FROM certificados WHERE dni_clave = ? ORDER BY fecha DESC, id DESC",
+            (clave_dni(dni),)).fetchall()
+
+    def entre_fechas(self, desde, hasta):
+        """Certificados con fecha de práctica entre desde y hasta (dd/mm/yyyy o ISO), ambas incluidas"""
+        return self.conexion.execute(
+            f"SELECT {_COLUMNAS} FROM certificados WHERE fecha BETWEEN ? AND ? ORDER BY fecha, id",
+            (fecha_iso(desde), fecha_iso(hasta))).fetchall()
+
+    def duplicados(self, estudiantes, fecha, origen=None):
+        """Estudiantes que ya tienen certificado para esa fecha de práctica.
+
+        Con origen no cuentan los emitidos desde ese mismo PDF (volver a
+        procesarlo no es un duplicado). Devuelve una lista de (estudiante,
+        fila del registro más reciente).
+        """
+        fecha = fecha_iso(fecha)
+        consulta = f"SELECT {_COLUMNAS} FROM certificados WHERE dni_clave = ? AND fecha = ?"
+        parametros = [fecha]
+        if origen:
+            consulta += " AND origen IS NOT ?"
+            parametros.append(_ruta_origen(origen))
+        consulta += " ORDER BY id DESC LIMIT 1"
+        encontrados = []
+        for estudiante in estudiantes:
+            fila = self.conexion.execute(consulta, [clave_dni(estudiante.dni)] + parametros).fetchone()
+            if fila is not None:
+                encontrados.append((estudiante, fila))
+        return encontrados
+
+    def reimprimir(self, dni, fecha=None, destino=None):
+        """Devuelve el certificado guardado más reciente de un DNI sin volver a generarlo.
+
+        Con fecha se limita a esa práctica. Se comprueba que el archivo no ha
+        cambiado (hash); con destino (carpeta) se copia allí y se devuelve la
+        copia. Los que están dentro de un ZIP/tar siempre se extraen.
+        """
+        for fila in self.por_dni(dni):
+            if fecha is not None and fila['fecha'] != fecha_iso(fecha):
+                continue
+            ruta = Path(fila['ruta'])
+            try:
+                datos = leer_certificado(ruta)
+            except (OSError, KeyError) as e:
+                print(f"Certificado registrado no disponible {ruta}: {str(e)}")
+                continue
+            if fila['huella'] and hashlib.sha256(datos).hexdigest() != fila['huella']:
+                print(f"El certificado {ruta} ha cambiado desde que se registró")
+                continue
+            if destino is None:
+                if ruta.is_file():
+                    return ruta
+                destino = self.ruta.parent / "reimpresiones"
+            copia = Path(destino) / ruta.name
+            copia.parent.mkdir(parents=True, exist_ok=True)
+            if ruta.is_file():
+                shutil.copy2(ruta, copia)
+            else:
+                copia.write_bytes(datos)
+            return copia
+        return None
@@ -11,36 +11,8 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
 from reportlab.lib.styles import getSampleStyleSheet
 from datetime import datetime
 from reportlab.pdfgen import canvas
-
-def separar_nombre_completo(nombre_completo):
-    """Separa nombres y apellidos usando coma como separador"""
-    if ',' in nombre_completo:
-        # Formato: "Apellidos, Nombres"
-        partes = nombre_completo.strip().split(',', 1)
-        nombres = partes[0].strip()
-        apellidos = partes[1].strip() if len(partes) > 1 else ""
-        
-        # Dividir apellidos en dos partes si es necesario
-        apellidos_partes = apellidos.split()
-        if len(apellidos_partes) >= 2:
-            apellido1 = apellidos_partes[0]
-            apellido2 = " ".join(apellidos_partes[1:])
-        else:
-            apellido1 = apellidos
-            apellido2 = ""
-            
-        return nombres, apellido1, apellido2
-    else:
-        # Mantener lógica original si no hay coma
-        partes = nombre_completo.strip().split()
-        if len(partes) == 0:
-            return ("", "", "")
-        elif len(partes) == 1:
-            return (partes[0], "", "")
-        elif len(partes) == 2:
-            return (partes[0], partes[1], "")
-        else:
-            return (" ".join(partes[:-2]), partes[-2], partes[-1])
+from config import REPORTE_PAGINADO
+from core.listado import como_estudiante, separar_nombre_completo
 
 def crear_campo_editable(page, x, y, width, height, field_name):
     """Crea un campo de texto editable en una posición específica"""
@@ -69,88 +41,191 @@ def crear_campo_editable(page, x, y, width, height, field_name):
     page["/Annots"].append(field)
     return field
 
+# Diseño de la tabla del reporte
+COL_WIDTHS = [20*mm, 30*mm, 75*mm, 30*mm, 75*mm]
+COLUMNA_LICENCIA = 3
+ALTO_FILA = 8*mm
+ENCABEZADOS = ["FECHA", "DNI", "APELLIDOS Y NOMBRE", "N° LICENCIA", "INSTRUCTOR"]
+
+def _fila_tabla(estudiante):
+    """Convierte un estudiante en los valores de su fila"""
+    nombre_completo = f"{estudiante['apellido1']} {estudiante['apellido2']} {estudiante['nombre']}".strip()
+    return [
+        estudiante['fecha'],
+        estudiante['dni'],
+        nombre_completo,
+        "",  # Campo editable
+        estudiante['instructor']
+    ]
+
+class RejillaReporte:
+    """Dibuja bloques de filas de la tabla con el mínimo de operaciones PDF.
+
+    Las posiciones de columna se calculan una vez; por bloque se rellena la
+    banda del encabezado una sola vez, todas las líneas de la cuadrícula van
+    en un único trazado y todo el texto en un único objeto de texto.
+    """
+    def __init__(self, x_inicial, fuente="Helvetica", tamano_fuente=10):
+        from reportlab.pdfbase.pdfmetrics import stringWidth
+
+        self.x_inicial = x_inicial
+        self.fuente = fuente
+        self.tamano_fuente = tamano_fuente
+        self._ancho_texto = stringWidth
+        self.bordes = [x_inicial]
+        for ancho in COL_WIDTHS:
+            self.bordes.append(self.bordes[-1] + ancho)
+        self.centros = [(izq + der) / 2 for izq, der in zip(self.bordes, self.bordes[1:])]
+        self.x_licencia = self.bordes[COLUMNA_LICENCIA]
+
+    def dibujar(self, c, y_superior, filas, con_encabezado=True):
+        """Dibuja las filas (la primera es el encabezado si con_encabezado) desde y_superior"""
+        from reportlab.lib.colors import black, HexColor
+
+        if not filas:
+            return
+        y_inferior = y_superior - ALTO_FILA * len(filas)
+        x_final = self.bordes[-1]
+
+        # Banda del encabezado
+        if con_encabezado:
+            c.setFillColor(HexColor('#92D050'))
+            c.rect(self.x_inicial, y_superior - ALTO_FILA, x_final - self.x_inicial, ALTO_FILA,
+                   stroke=0, fill=1)
+
+        # Cuadrícula en un único trazado
+        trazado = c.beginPath()
+        for fila in range(len(filas) + 1):
+            y = y_superior - ALTO_FILA * fila
+            trazado.moveTo(self.x_inicial, y)
+            trazado.lineTo(x_final, y)
+        for x in self.bordes:
+            trazado.moveTo(x, y_superior)
+            trazado.lineTo(x, y_inferior)
+        c.setStrokeColor(black)
+        c.drawPath(trazado, stroke=1, fill=0)
+
+        # Texto centrado en un único objeto de texto
+        texto = c.beginText()
+        texto.setFont(self.fuente, self.tamano_fuente)
+        texto.setFillColor(black)
+        y = y_superior - ALTO_FILA/2 - 3
+        for fila in filas:
+            for centro, valor in zip(self.centros, fila):
+                valor = str(valor)
+                if valor:
+                    ancho = self._ancho_texto(valor, self.fuente, self.tamano_fuente)
+                    texto.setTextOrigin(centro - ancho/2, y)
+                    texto.textOut(valor)
+            y -= ALTO_FILA
+        c.drawText(texto)
+
+    def campo_licencia(self, c, y_superior, numero):
+        """Añade el campo editable de licencia de la fila cuyo borde superior está en y_superior"""
+        from reportlab.lib.colors import black
+
+        c.acroForm.textfield(
+            name=f"licencia_{numero}",
+            tooltip=f"N° Licencia fila {numero}",
+            x=self.x_licencia+2, y=y_superior - ALTO_FILA + 2,
+            width=COL_WIDTHS[COLUMNA_LICENCIA]-4, height=ALTO_FILA-4,
+            borderStyle='solid', borderWidth=0.5, forceBorder=True,
+            fontName="Helvetica", fontSize=10,
+            fillColor=None, textColor=black
+        )
+
 def generar_pdf_con_campos(datos, output_path):
     """Genera PDF con campos editables usando ReportLab y acroForm (100% compatible)"""
-    from reportlab.lib.pagesizes import landscape, letter
-    from reportlab.lib.units import mm
-    from reportlab.lib.colors import black, HexColor
-
     # Configuración
     margen_izquierdo = 15*mm
     margen_superior = 15*mm
-    col_widths = [20*mm, 30*mm, 75*mm, 30*mm, 75*mm]
-    columna_licencia = 3
-    alto_fila = 8*mm
-    encabezados = ["FECHA", "DNI", "APELLIDOS Y NOMBRE", "N° LICENCIA", "INSTRUCTOR"]
 
     # Preparar datos de tabla
-    tabla_datos = [encabezados]
+    tabla_datos = [ENCABEZADOS]
     for estudiante in datos:
-        nombre_completo = f"{estudiante['apellido1']} {estudiante['apellido2']} {estudiante['nombre']}".strip()
-        tabla_datos.append([
-            estudiante['fecha'],
-            estudiante['dni'],
-            nombre_completo,
-            "",  # Campo editable
-            estudiante['instructor']
-        ])
+        tabla_datos.append(_fila_tabla(estudiante))
 
     num_filas = len(tabla_datos)
-    ancho_total = sum(col_widths) + margen_izquierdo*2
-    alto_total = margen_superior + alto_fila * num_filas + 15*mm
+    ancho_total = sum(COL_WIDTHS) + margen_izquierdo*2
+    alto_total = margen_superior + ALTO_FILA * num_filas + 15*mm
 
     c = canvas.Canvas(output_path, pagesize=(ancho_total, alto_total))
     c.setFont("Helvetica", 10)
 
     # Dibujar tabla
+    rejilla = RejillaReporte(margen_izquierdo)
     y = alto_total - margen_superior
-    for fila_idx, fila in enumerate(tabla_datos):
-        x = margen_izquierdo
-        for col_idx, valor in enumerate(fila):
-            c.setStrokeColor(black)
-            c.setFillColor(HexColor('#92D050') if fila_idx == 0 else "white")
-            c.rect(x, y - alto_fila, col_widths[col_idx], alto_fila, fill=1)
-            c.setFillColor(black)
-            c.drawCentredString(x + col_widths[col_idx]/2, y - alto_fila/2 - 3, str(valor))
-            x += col_widths[col_idx]
-        y -= alto_fila
+    rejilla.dibujar(c, y, tabla_datos)
 
     # Añadir campos editables en la columna de licencia (solo filas de datos, omitir encabezado)
-    y = alto_total - margen_superior - alto_fila * 2  # Empieza en la segunda fila
-    for i in range(2, num_filas+1):  # Incluye la última fila
-        x = margen_izquierdo + sum(col_widths[:columna_licencia])
-        c.acroForm.textfield(
-            name=f"licencia_{i-1}",
-            tooltip=f"N° Licencia fila {i-1}",
-            x=x+2, y=y+2, width=col_widths[columna_licencia]-4, height=alto_fila-4,
-            borderStyle='solid', borderWidth=0.5, forceBorder=True,
-            fontName="Helvetica", fontSize=10,
-            fillColor=None, textColor=black
-        )
-        y -= alto_fila
+    y -= ALTO_FILA  # Empieza en la segunda fila
+    for i in range(1, num_filas):
+        rejilla.campo_licencia(c, y, i)
+        y -= ALTO_FILA
 
     c.save()
 
-def generar_reporte_estudiantes(datos_pdf, estudiantes_info, output_dir):
-    """Genera reporte PDF en lugar de Excel"""
-    # Preparar datos para PDF
-    reporte_data = []
-    
-    for dni, nombre_completo in estudiantes_info:
-        nombre, apellido1, apellido2 = separar_nombre_completo(nombre_completo)
-        
-        reporte_data.append({
+def generar_pdf_paginado(filas, output_path, pagesize=landscape(letter)):
+    """Genera el reporte en páginas apaisadas de tamaño fijo con el encabezado repetido.
+
+    Las filas se consumen de un iterador página a página, así que la memoria
+    y el tamaño de cada página no crecen con el número de estudiantes. Los
+    campos se numeran licencia_1, licencia_2... en todo el documento.
+    """
+    ancho, alto = pagesize
+    margen_vertical = 15*mm
+    rejilla = RejillaReporte((ancho - sum(COL_WIDTHS)) / 2)
+    filas_por_pagina = int((alto - 2*margen_vertical) // ALTO_FILA) - 1  # menos el encabezado
+    y_superior = alto - margen_vertical
+
+    c = canvas.Canvas(output_path, pagesize=pagesize, pageCompression=1)
+    numero = 0
+    pagina = [ENCABEZADOS]
+
+    def cerrar_pagina():
+        rejilla.dibujar(c, y_superior, pagina)
+        y = y_superior - ALTO_FILA
+        for i in range(numero - len(pagina) + 2, numero + 1):
+            rejilla.campo_licencia(c, y, i)
+            y -= ALTO_FILA
+        c.showPage()
+
+    for estudiante in filas:
+        numero += 1
+        pagina.append(_fila_tabla(estudiante))
+        if len(pagina) > filas_por_pagina:
+            cerrar_pagina()
+            pagina = [ENCABEZADOS]
+
+    if len(pagina) > 1 or numero == 0:
+        cerrar_pagina()
+    c.save()
+
+def filas_reporte(datos_pdf, estudiantes_info):
+    """Genera los datos de cada fila del reporte a medida que se piden"""
+    for estudiante in estudiantes_info:
+        estudiante = como_estudiante(estudiante)
+
+        yield {
             'fecha': datos_pdf.get('C_1', ''),
-            'dni': dni,
-            'nombre': nombre,
-            'apellido1': apellido1,
-            'apellido2': apellido2,
+            'dni': estudiante.dni,
+            'nombre': estudiante.nombre,
+            'apellido1': estudiante.apellido1,
+            'apellido2': estudiante.apellido2,
             'instructor': datos_pdf.get("A_INSTR", "")
-        })
+        }
+
+def generar_reporte_estudiantes(datos_pdf, estudiantes_info, output_dir, paginado=None):
+    """Genera reporte PDF en lugar de Excel"""
+    if paginado is None:
+        paginado = REPORTE_PAGINADO
 
     # Generar PDF con timestamp
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     reporte_path = output_dir / f"Reporte_estudiantes_{timestamp}.pdf"
-    generar_pdf_con_campos(reporte_data, str(reporte_path))
+    if paginado:
+        generar_pdf_paginado(filas_reporte(datos_pdf, estudiantes_info), str(reporte_path))
+    else:
+        generar_pdf_con_campos(list(filas_reporte(datos_pdf, estudiantes_info)), str(reporte_path))
     
     return str(reporte_path)
@@ -0,0 +1,468 @@
+# core/servicio.py
+import hmac
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import secrets
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from config import (CERTIFICADOS_PLANTILLA, SERVICIO_LATIDO, SERVICIO_PROCESOS, SERVICIO_PUERTO,
+                    SERVICIO_TOKEN)
+
+PRIORIDAD_NORMAL = 10
+
+LOGO = "aliboat logo.png"
+
+# Cabecera con el token de la instalación
+CABECERA_TOKEN = "X-Token-Servicio"
+
+# Trabajos terminados que se recuerdan para poder consultarlos
+MAX_HISTORIAL = 1000
+
+def _iniciar_proceso():
+    """Deja el proceso listo: librerías importadas, plantilla compilada y fuentes registradas"""
+    from core.arranque import precargar_modulos
+    precargar_modulos()
+    _calentar()
+
+def _calentar():
+    """Renderiza en memoria un certificado de prueba (ReportLab, PIL, PyPDF2, plantilla
+    y fuentes) para que todo siga cargado tras un rato sin uso"""
+    import PyPDF2
+    from core.certificate_builder import PlantillaCertificado
+    from core.template_designer import CAMPOS_ESTUDIANTE, cargar_plantilla
+    campos = cargar_plantilla(CERTIFICADOS_PLANTILLA).campos - set(CAMPOS_ESTUDIANTE) - {'logo', 'fecha'}
+    datos = dict.fromkeys(campos, "")
+    datos['C_1'] = datetime.now().strftime("%d/%m/%Y")
+    contenido = PlantillaCertificado(datos, LOGO).renderizar({'dni': "00000000T", 'nombre': "Prueba"})
+    escritor = PyPDF2.PdfWriter()
+    for pagina in PyPDF2.PdfReader(io.BytesIO(contenido)).pages:
+        escritor.add_page(pagina)
+    escritor.write(io.BytesIO())
+    return os.getpid()
+
+def _ejecutar(parametros, cancelar):
+    from core.pipeline import generar_desde_pdf
+    return generar_desde_pdf(**parametros, cancelado=cancelar.is_set)
+
+class Trabajo:
+    """Generación pedida al servicio y su estado"""
+    def __init__(self, id_trabajo, prioridad, parametros):
+        self.id = id_trabajo
+        self.prioridad = prioridad
+        self.parametros = parametros
+        self.estado = "en_cola"
+        self.resultado = None
+        self.error = None
+        self.creado = time.time()
+        self.iniciado = None
+        self.terminado = None
+        self.hecho = threading.Event()
+        self.cancelar = None
+
+    def __lt__(self, otro):
+        return (self.prioridad, self.id) < (otro.prioridad, otro.id)
+
+    def resumen(self):
+        espera = (self.iniciado or time.time()) - self.creado
+        return {
+            'id': self.id,
+            'estado': self.estado,
+            'prioridad': self.prioridad,
+            'pdf': self.parametros.get('ruta_pdf'),
+            'output_dir': self.parametros.get('output_dir'),
+            'espera_s': round(espera, 3),
+            'duracion_s': round(self.terminado - self.iniciado, 3) if self.terminado and self.iniciado else None,
+            'resultado': self.resultado,
+            'error': self.error,
+        }
+
+# Marca de cierre: prioridad mínima para salir antes que cualquier trabajo
+_FIN = Trabajo(0, float('-inf'), {})
+
+class ServicioRender:
+    """Pool de procesos siempre caliente que atiende trabajos por prioridad.
+
+    Los procesos se crean al arrancar (no con el primer trabajo) con las
+    librerías, la plantilla y las fuentes ya cargadas. Solo se saca un
+    trabajo de la cola cuando hay un proceso libre, así que uno urgente
+    enviado después adelanta a los que esperan (menor prioridad = antes).
+    Tras latido segundos sin trabajos se vuelve a ejercitar cada proceso
+    para que el primer trabajo después de un rato parado tarde lo mismo.
+    Todas las carpetas de salida quedan dentro de salida.
+    """
+    def __init__(self, procesos=None, latido=None, salida="output"):
+        self.procesos = procesos or SERVICIO_PROCESOS
+        self.latido = latido or SERVICIO_LATIDO
+        self.salida = Path(salida).resolve()
+        # Eventos de cancelación compartidos con los procesos del pool
+        self._manager = multiprocessing.Manager()
+        self.pool = ProcessPoolExecutor(max_workers=self.procesos, initializer=_iniciar_proceso)
+        self.cola = queue.PriorityQueue()
+        self.trabajos = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._libres = threading.Semaphore(self.procesos)
+        self._parar = threading.Event()
+        self.calentar(esperar=True)
+        self._despachador = threading.Thread(target=self._despachar, name="DespachadorRender", daemon=True)
+        self._despachador.start()
+
+    def calentar(self, esperar=False):
+        """Envía una tarea ligera a cada proceso (con esperar, hasta que terminen)"""
+        futuros = [self.pool.submit(_calentar) for _ in range(self.procesos)]
+        if esperar:
+            for futuro in futuros:
+                futuro.result()
+
+    def enviar(self, parametros, prioridad=PRIORIDAD_NORMAL):
+        """Encola una generación (parámetros de core.pipeline.generar_desde_pdf).
+
+        Si no se indica output_dir se usa <salida>/<fecha_hora>/<pdf>_<id>;
+        si se indica tiene que estar dentro de salida (ValueError si no).
+        """
+        if 'output_dir' in parametros:
+            destino = Path(parametros['output_dir']).resolve()
+            if destino != self.salida and self.salida not in destino.parents:
+                raise ValueError(f"La carpeta de salida debe estar dentro de {self.salida}")
+            parametros['output_dir'] = str(destino)
+        with self._lock:
+            trabajo = Trabajo(next(self._ids), prioridad, parametros)
+            trabajo.cancelar = self._manager.Event()
+            if 'output_dir' not in parametros:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                nombre = f"{Path(parametros['ruta_pdf']).stem}_{trabajo.id}"
+                parametros['output_dir'] = str(self.salida / timestamp / nombre)
+            self.trabajos[trabajo.id] = trabajo
+            self._olvidar_antiguos()
+        self.cola.put(trabajo)
+        return trabajo
+
+    def trabajo(self, id_trabajo):
+        return self.trabajos.get(id_trabajo)
+
+    def cancelar(self, id_trabajo):
+        """Cancela un trabajo: si sigue en cola ya no empieza; si está en curso se
+        detiene tras el certificado que esté generando. None si no existe."""
+        with self._lock:
+            trabajo = self.trabajos.get(id_trabajo)
+            if trabajo is None:
+                return None
+            if trabajo.estado == "en_cola":
+                trabajo.estado = "cancelado"
+                trabajo.terminado = time.time()
+                trabajo.hecho.set()
+            elif trabajo.estado == "en_curso":
+                trabajo.cancelar.set()
+        return trabajo
+
+    def estado(self):
+        with self._lock:
+            estados = [trabajo.estado for trabajo in self.trabajos.values()]
+        return {
+            'procesos': self.procesos,
+            'en_cola': self.cola.qsize(),
+            'en_curso': estados.count("en_curso"),
+            'terminados': estados.count("terminado"),
+            'con_error': estados.count("error"),
+            'cancelados': estados.count("cancelado"),
+        }
+
+    def cerrar(self):
+        self._parar.set()
+        self.cola.put(_FIN)
+        self._despachador.join()
+        self.pool.shutdown(cancel_futures=True)
+        self._manager.shutdown()
+
+    def _olvidar_antiguos(self):
+        terminados = [t for t in self.trabajos.values() if t.hecho.is_set()]
+        for trabajo in terminados[:max(0, len(terminados) - MAX_HISTORIAL)]:
+            del self.trabajos[trabajo.id]
+
+    def _despachar(self):
+        while not self._parar.is_set():
+            # Esperar a un proceso libre antes de elegir trabajo para respetar la prioridad
+            self._libres.acquire()
+            try:
+                trabajo = self.cola.get(timeout=self.latido)
+            except queue.Empty:
+                self._libres.release()
+                self.calentar()
+                continue
+            if trabajo is _FIN:
+                self._libres.release()
+                return
+            with self._lock:
+                if trabajo.estado == "cancelado":
+                    self._libres.release()
+                    continue
+                trabajo.estado = "en_curso"
+                trabajo.iniciado = time.time()
+            try:
+                futuro = self.pool.submit(_ejecutar, trabajo.parametros, trabajo.cancelar)
+            except Exception as e:
+                self._terminar(trabajo, None, str(e))
+                continue
+            futuro.add_done_callback(lambda f, trabajo=trabajo: self._terminar_futuro(trabajo, f))
+
+    def _terminar_futuro(self, trabajo, futuro):
+        try:
+            resultado = futuro.result()
+        except Exception as e:
+            self._terminar(trabajo, None, str(e))
+        else:
+            self._terminar(trabajo, resultado, resultado.get('error'))
+
+    def _terminar(self, trabajo, resultado, error):
+        trabajo.resultado = resultado
+        trabajo.error = error
+        if error:
+            trabajo.estado = "error"
+        elif resultado.get('cancelado'):
+            trabajo.estado = "cancelado"
+        else:
+            trabajo.estado = "terminado"
+        trabajo.terminado = time.time()
+        trabajo.hecho.set()
+        self._libres.release()
+
+def parametros_trabajo(peticion):
+    """Convierte el JSON de una petición en parámetros de generar_desde_pdf.
+
+    Instructor y barco se buscan por nombre o DNI/matrícula en datos.json,
+    igual que en el modo por lotes. La carpeta de salida la limita después
+    ServicioRender.enviar.
+    """
+    from core.catalogo import RUTA_DATOS, obtener_catalogo
+    if not peticion.get('pdf'):
+        raise ValueError("Falta 'pdf'")
+    ruta_datos = peticion.get('datos') or RUTA_DATOS
+    parametros = {
+        'ruta_pdf': str(Path(peticion['pdf']).resolve()),
+        'ruta_datos': ruta_datos,
+        'logo_path': peticion.get('logo') or LOGO,
+        'ruta_listado': peticion.get('listado'),
+        'archivo': peticion.get('archivo'),
+        'perfil': peticion.get('perfil'),
+        'datos_pdf': peticion.get('campos'),
+    }
+    if parametros['archivo'] not in (None, "", "zip", "tar"):
+        raise ValueError(f"Formato de archivo no válido: {parametros['archivo']}")
+    if peticion.get('output_dir'):
+        parametros['output_dir'] = peticion['output_dir']
+    if peticion.get('instructor'):
+        parametros['instructor'] = obtener_catalogo(ruta_datos).instructor(peticion['instructor'])
+        if parametros['instructor'] is None:
+            raise ValueError(f"Instructor no encontrado en datos.json: {peticion['instructor']}")
+    if peticion.get('barco'):
+        barco = obtener_catalogo(ruta_datos).barco(peticion['barco'])
+        if barco is None:
+            raise ValueError(f"Barco no encontrado en datos.json: {peticion['barco']}")
+        parametros['barco'] = barco['nombre']
+    return parametros
+
+def token_servicio():
+    """Token de esta instalación (SERVICIO_TOKEN); se crea la primera vez que se pide"""
+    ruta = Path(SERVICIO_TOKEN)
+    try:
+        token = ruta.read_text(encoding='utf-8').strip()
+        if token:
+            return token
+    except FileNotFoundError:
+        pass
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    token = secrets.token_urlsafe(32)
+    # Temporal por proceso y os.replace: quien llegue a la vez lee un token completo
+    temporal = ruta.with_name(f"{ruta.name}.{os.getpid()}.tmp")
+    descriptor = os.open(temporal, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(descriptor, 'w', encoding='utf-8') as f:
+        f.write(token)
+    try:
+        os.link(temporal, ruta)
+    except FileExistsError:
+        token = ruta.read_text(encoding='utf-8').strip()
+    finally:
+        os.remove(temporal)
+    return token
+
+class _Manejador(BaseHTTPRequestHandler):
+    """API JSON: POST /trabajos, POST /trabajos/<id>/cancelar,
+    GET /trabajos/<id>[?esperar=1], GET /estado.
+
+    POST /trabajos recibe {"pdf", "instructor", "barco", "logo", "output_dir",
+    "listado", "archivo", "prioridad", "esperar", ...} y devuelve el
+    resumen del trabajo (con el resultado si esperar es true).
+    Solo se atienden peticiones a 127.0.0.1:<puerto>, sin cabecera Origin
+    (ningún navegador) y con el token de la instalación; los POST además
+    tienen que ser application/json.
+    """
+    servicio = None
+    token = None
+
+    def do_GET(self):
+        if not self._autorizada():
+            return
+        ruta, _, consulta = self.path.partition('?')
+        if ruta == "/estado":
+            return self._responder(200, self.servicio.estado())
+        if ruta.startswith("/trabajos/"):
+            trabajo = self.servicio.trabajo(_id_trabajo(ruta.split('/')[2]))
+            if trabajo is None:
+                return self._responder(404, {'error': "Trabajo no encontrado"})
+            if "esperar=1" in consulta:
+                trabajo.hecho.wait()
+            return self._responder(200, trabajo.resumen())
+        self._responder(404, {'error': "Ruta no encontrada"})
+
+    def do_POST(self):
+        if not self._autorizada():
+            return
+        tipo = self.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        if tipo != 'application/json':
+            return self._responder(415, {'error': "Se esperaba Content-Type: application/json"})
+        partes = self.path.split('/')
+        if len(partes) == 4 and partes[1] == "trabajos" and partes[3] == "cancelar":
+            trabajo = self.servicio.cancelar(_id_trabajo(partes[2]))
+            if trabajo is None:
+                return self._responder(404, {'error': "Trabajo no encontrado"})
+            return self._responder(200, trabajo.resumen())
+        if self.path != "/trabajos":
+            return self._responder(404, {'error': "Ruta no encontrada"})
+        try:
+            longitud = int(self.headers.get('Content-Length', 0))
+            peticion = json.loads(self.rfile.read(longitud) or b"{}")
+            parametros = parametros_trabajo(peticion)
+            prioridad = int(peticion.get('prioridad', PRIORIDAD_NORMAL))
+            trabajo = self.servicio.enviar(parametros, prioridad)
+        except Exception as e:
+            return self._responder(400, {'error': str(e)})
+        if peticion.get('esperar'):
+            trabajo.hecho.wait()
+        self._responder(202 if not trabajo.hecho.is_set() else 200, trabajo.resumen())
+
+    def _autorizada(self):
+        """Comprueba origen, host y token; si no valen responde 403 y devuelve False"""
+        if self.headers.get('Origin') is not None:
+            error = "No se aceptan peticiones de navegadores"
+        elif self.headers.get('Host') != f"127.0.0.1:{self.server.server_address[1]}":
+            error = "Host no válido"
+        elif not hmac.compare_digest(self.headers.get(CABECERA_TOKEN, ''), self.token):
+            error = "Token no válido"
+        else:
+            return True
+        self._responder(403, {'error': error})
+        return False
+
+    def _responder(self, codigo, datos):
+        cuerpo = json.dumps(datos, ensure_ascii=False).encode('utf-8')
+        self.send_response(codigo)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *args):
+        pass
+
+def _id_trabajo(texto):
+    try:
+        return int(texto)
+    except ValueError:
+        return None
+
+def servir(puerto=None, procesos=None, salida="output"):
+    """Arranca el servicio en 127.0.0.1 y atiende peticiones hasta Ctrl+C"""
+    puerto = puerto or SERVICIO_PUERTO
+    inicio = time.perf_counter()
+    servicio = ServicioRender(procesos, salida=salida)
+    manejador = type("Manejador", (_Manejador,), {'servicio': servicio, 'token': token_servicio()})
+    servidor = ThreadingHTTPServer(("127.0.0.1", puerto), manejador)
+    print(f"Servicio de renderizado en {url_servicio(puerto)} "
+          f"({servicio.procesos} procesos listos en {time.perf_counter() - inicio:.2f} s, "
+          f"salida en {servicio.salida})")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        servicio.cerrar()
+    return 0
+
+# --- Cliente ---
+
+def url_servicio(puerto=None):
+    return f"http://127.0.0.1:{puerto or SERVICIO_PUERTO}"
+
+def _peticion(url, datos=None, timeout=None):
+    """GET (o POST JSON si hay datos) al servicio con el token; devuelve el JSON de la respuesta"""
+    cabeceras = {CABECERA_TOKEN: token_servicio()}
+    if datos is not None:
+        cabeceras['Content-Type'] = 'application/json'
+        datos = json.dumps(datos, ensure_ascii=False).encode('utf-8')
+    solicitud = urllib.request.Request(url, data=datos, headers=cabeceras)
+    try:
+        with urllib.request.urlopen(solicitud, timeout=timeout) as respuesta:
+            return json.loads(respuesta.read())
+    except urllib.error.HTTPError as e:
+        raise RuntimeError(json.loads(e.read()).get('error', str(e)))
+
+def servicio_disponible(url=None, timeout=0.5):
+    """True si hay un servicio de renderizado escuchando que acepta el token"""
+    try:
+        _peticion(f"{url or url_servicio()}/estado", timeout=timeout)
+        return True
+    except (OSError, RuntimeError, ValueError):
+        return False
+
+def enviar_trabajo(pdf, url=None, esperar=True, prioridad=PRIORIDAD_NORMAL, **opciones):
+    """Envía un PDF al servicio y devuelve el resumen del trabajo.
+
+    opciones: instructor, barco, datos, logo, output_dir (carpeta exacta,
+    dentro de la salida del servicio), listado, archivo, perfil y campos
+    (datos del PDF ya leídos). Las rutas se envían absolutas porque
+    el servicio puede ejecutarse en otra carpeta. Con esperar=True se
+    bloquea hasta que termina y el resumen incluye el resultado.
+    """
+    peticion = {'pdf': str(Path(pdf).resolve()), 'prioridad': prioridad, 'esperar': esperar}
+    for clave, valor in opciones.items():
+        if valor is not None and clave in ('datos', 'logo', 'output_dir', 'listado'):
+            valor = str(Path(valor).resolve())
+        peticion[clave] = valor
+    return _peticion(f"{url or url_servicio()}/trabajos", peticion)
+
+def esperar_trabajo(id_trabajo, url=None):
+    """Espera a que termine un trabajo enviado con esperar=False y devuelve su resumen"""
+    return _peticion(f"{url or url_servicio()}/trabajos/{id_trabajo}?esperar=1")
+
+def cancelar_trabajo(id_trabajo, url=None):
+    """Pide al servicio que cancele un trabajo y devuelve su resumen"""
+    return _peticion(f"{url or url_servicio()}/trabajos/{id_trabajo}/cancelar", {})
+
+def resultado_trabajo(resumen):
+    """Resultado de generar_desde_pdf de un trabajo, también si falló o se canceló
+    antes de empezar (con las mismas claves que uno terminado)"""
+    if resumen.get('resultado'):
+        return resumen['resultado']
+    cancelado = resumen.get('estado') == "cancelado"
+    return {
+        'pdf': resumen.get('pdf'),
+        'error': None if cancelado else resumen.get('error') or resumen.get('estado'),
+        'output_dir': resumen.get('output_dir'),
+        'certificados': [],
+        'reporte': None,
+        'errores': [],
+        'duplicados': [],
+        'cancelado': cancelado,
+        'segundos': resumen.get('duracion_s') or 0,
+    }
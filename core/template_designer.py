@@ -0,0 +1,205 @@
+# core/template_designer.py
+import hashlib
+import json
+import os
+import string
+from pathlib import Path
+from xml.sax.saxutils import escape
+from reportlab.lib import pagesizes
+from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_LEFT, TA_RIGHT
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import cm
+from core.fuentes import fuentes_certificado
+
+CARPETA_APLICACION = Path(__file__).resolve().parent.parent
+
+# Campos que cambian en cada certificado; el resto se sustituye una vez por lote
+CAMPOS_ESTUDIANTE = ('nombre', 'dni')
+
+ALINEACIONES = {'izquierda': TA_LEFT, 'centro': TA_CENTER, 'derecha': TA_RIGHT, 'justificado': TA_JUSTIFY}
+ALINEACIONES_BLOQUE = {'izquierda': 'LEFT', 'centro': 'CENTER', 'derecha': 'RIGHT'}
+
+# Equivalencias entre las claves de la plantilla y los atributos de ParagraphStyle
+_ATRIBUTOS_ESTILO = {
+    'tamano': 'fontSize',
+    'interlineado': 'leading',
+    'sangria': 'firstLineIndent',
+    'sangria_izquierda': 'leftIndent',
+    'sangria_derecha': 'rightIndent',
+}
+_ATRIBUTOS_ESTILO_CM = {
+    'espacio_antes_cm': 'spaceBefore',
+    'espacio_despues_cm': 'spaceAfter',
+}
+
+# Plantillas compiladas en este proceso: ruta -> (mtime, tamaño, plantilla) y hash -> plantilla
+_por_ruta = {}
+_por_huella = {}
+
+class Texto:
+    """Texto de la plantilla partido en fragmentos fijos y campos {campo}"""
+    def __init__(self, fuente):
+        self.partes = [(literal, campo) for literal, campo, _, _ in string.Formatter().parse(fuente)]
+        self.campos = {campo for _, campo in self.partes if campo}
+
+    @property
+    def por_estudiante(self):
+        return bool(self.campos & set(CAMPOS_ESTUDIANTE))
+
+    def sustituir(self, valores, conservar=(), escapar=True):
+        """Rellena los campos con valores; los de conservar quedan como {campo}.
+
+        Los valores se escapan para el marcado de Paragraph salvo con
+        escapar=False. Devuelve un Texto nuevo (o el texto final si no queda
+        ningún campo).
+        """
+        resultado = []
+        for literal, campo in self.partes:
+            resultado.append(literal.replace('{', '{{').replace('}', '}}'))
+            if campo is None:
+                continue
+            if campo in conservar:
+                resultado.append('{' + campo + '}')
+            elif campo in valores:
+                valor = escape(str(valores[campo])) if escapar else str(valores[campo])
+                resultado.append(valor.replace('{', '{{').replace('}', '}}'))
+            else:
+                raise KeyError(f"La plantilla usa el campo '{campo}' y no está en los datos")
+        texto = Texto(''.join(resultado))
+        return texto if texto.campos else texto.final()
+
+    def final(self):
+        return ''.join(literal for literal, _ in self.partes)
+
+class PlantillaCompilada:
+    """Plantilla JSON analizada una vez: página, estilos y bloques listos para dibujar.
+
+    Los bloques son tuplas (tipo, ...) con los textos ya partidos en
+    fragmentos; PlantillaCertificado las convierte en flowables por lote.
+    """
+    def __init__(self, definicion, huella, carpeta):
+        self.huella = huella
+        self.nombre = definicion.get('nombre', '')
+        self.carpeta = carpeta
+        self.pagina = _pagina(definicion.get('pagina', {}))
+        self.estilos = _estilos(definicion.get('estilos', {}))
+        self.bloques = [self._bloque(bloque) for bloque in definicion.get('bloques', [])]
+
+    @property
+    def campos(self):
+        """Todos los campos que usa la plantilla"""
+        campos = set()
+        for bloque in self.bloques:
+            for texto in _textos(bloque):
+                campos |= texto.campos
+        return campos
+
+    def _estilo(self, nombre):
+        try:
+            return self.estilos[nombre]
+        except KeyError:
+            raise ValueError(f"Estilo '{nombre}' no definido en la plantilla")
+
+    def _bloque(self, bloque):
+        tipo = bloque.get('tipo')
+        if tipo == 'texto':
+            return ('texto', self._estilo(bloque['estilo']), Texto(bloque['texto']))
+        if tipo == 'espacio':
+            return ('espacio', bloque['alto_cm'] * cm)
+        if tipo == 'imagen':
+            return ('imagen', Texto(bloque['ruta']), bloque['ancho_cm'] * cm, bloque['alto_cm'] * cm,
+                    ALINEACIONES_BLOQUE[bloque.get('alineacion', 'izquierda')],
+                    bloque.get('espacio_despues_cm', 0) * cm)
+        if tipo == 'firmas':
+            estilo = self._estilo(bloque['estilo'])
+            filas = {}
+            for fila in ('etiqueta', 'nombre', 'dni'):
+                estilo_fila = self._estilo(bloque.get(f'estilo_{fila}', bloque['estilo']))
+                filas[fila] = (estilo_fila, [Texto(columna.get(fila, '')) for columna in bloque['columnas']])
+            return ('firmas', estilo, filas, bloque['ancho_columna_cm'] * cm,
+                    bloque['ancho_linea_cm'] * cm, bloque.get('interlineado', 12))
+        raise ValueError(f"Tipo de bloque desconocido en la plantilla: {tipo}")
+
+def cargar_plantilla(ruta):
+    """Devuelve la plantilla compilada de ruta.
+
+    Se compila una vez por proceso y contenido: mientras el archivo no cambie
+    (fecha y tamaño) se devuelve la misma; si cambia se relee y, si su hash
+    es nuevo, se vuelve a compilar.
+    """
+    ruta = Path(ruta)
+    if not ruta.is_absolute() and not ruta.exists():
+        ruta = CARPETA_APLICACION / ruta
+    ruta = ruta.resolve()
+    estado = os.stat(ruta)
+    conocida = _por_ruta.get(str(ruta))
+    if conocida and conocida[:2] == (estado.st_mtime_ns, estado.st_size):
+        return conocida[2]
+
+    contenido = ruta.read_bytes()
+    huella = hashlib.sha256(contenido).hexdigest()
+    plantilla = _por_huella.get(huella)
+    if plantilla is None:
+        plantilla = PlantillaCompilada(json.loads(contenido.decode('utf-8')), huella, ruta.parent)
+        _por_huella[huella] = plantilla
+    _por_ruta[str(ruta)] = (estado.st_mtime_ns, estado.st_size, plantilla)
+    return plantilla
+
+def _pagina(pagina):
+    tamano = pagina.get('tamano', 'A4')
+    if isinstance(tamano, str):
+        tamano = getattr(pagesizes, tamano)
+    else:
+        tamano = (tamano[0] * cm, tamano[1] * cm)
+    return {
+        'pagesize': tamano,
+        'leftMargin': pagina.get('margen_izquierdo_cm', 2) * cm,
+        'rightMargin': pagina.get('margen_derecho_cm', 2) * cm,
+        'topMargin': pagina.get('margen_superior_cm', 2) * cm,
+        'bottomMargin': pagina.get('margen_inferior_cm', 2) * cm,
+    }
+
+def _estilos(definiciones):
+    """Crea los ParagraphStyle en orden, resolviendo 'hereda' y las fuentes"""
+    base = getSampleStyleSheet()
+    fuente, fuente_negrita = fuentes_certificado()
+    fuentes = {'normal': fuente, 'negrita': fuente_negrita}
+    estilos = {}
+
+    def crear(nombre, pila=()):
+        if nombre in estilos:
+            return estilos[nombre]
+        if nombre in pila or nombre not in definiciones:
+            raise ValueError(f"Estilo '{nombre}' no definido o con herencia circular")
+        definicion = definiciones[nombre]
+        padre = None
+        if 'hereda' in definicion:
+            padre = crear(definicion['hereda'], pila + (nombre,))
+        elif 'base' in definicion:
+            padre = base[definicion['base']]
+        atributos = {}
+        if 'fuente' in definicion:
+            atributos['fontName'] = fuentes[definicion['fuente']]
+        if 'alineacion' in definicion:
+            atributos['alignment'] = ALINEACIONES[definicion['alineacion']]
+        for clave, atributo in _ATRIBUTOS_ESTILO.items():
+            if clave in definicion:
+                atributos[atributo] = definicion[clave]
+        for clave, atributo in _ATRIBUTOS_ESTILO_CM.items():
+            if clave in definicion:
+                atributos[atributo] = definicion[clave] * cm
+        estilos[nombre] = ParagraphStyle(nombre, parent=padre, **atributos)
+        return estilos[nombre]
+
+    for nombre in definiciones:
+        crear(nombre)
+    return estilos
+
+def _textos(bloque):
+    if bloque[0] == 'texto':
+        return [bloque[2]]
+    if bloque[0] == 'imagen':
+        return [bloque[1]]
+    if bloque[0] == 'firmas':
+        return [texto for _, textos in bloque[2].values() for texto in textos]
+    return []
@@ -0,0 +1,74 @@
+# core/vista_previa.py
+import hashlib
+import json
+from collections import OrderedDict
+from config import CERTIFICADOS_FUENTES, CERTIFICADOS_PLANTILLA, VISTA_PREVIA_CACHE, VISTA_PREVIA_DPI
+from core.manifiesto import huella_logo
+
+# Imágenes ya renderizadas: hash de las entradas -> PNG (las más recientes al final)
+_vistas = OrderedDict()
+
+def _pymupdf():
+    """Módulo de PyMuPDF o None si no está instalado (es opcional)"""
+    try:
+        import pymupdf
+        return pymupdf
+    except ImportError:
+        pass
+    try:
+        import fitz
+        return fitz
+    except ImportError:
+        return None
+
+def vista_previa_disponible():
+    return _pymupdf() is not None
+
+def huella_vista_previa(datos_generales, estudiante, logo_path, dpi):
+    """Hash de todo lo que cambia la imagen: datos, estudiante, logo, plantilla y fuentes"""
+    from core.template_designer import cargar_plantilla
+    entradas = [
+        sorted((str(clave), str(valor)) for clave, valor in datos_generales.items()),
+        estudiante.dni,
+        estudiante.nombre_completo,
+        huella_logo(logo_path),
+        cargar_plantilla(CERTIFICADOS_PLANTILLA).huella,
+        CERTIFICADOS_FUENTES,
+        dpi,
+    ]
+    return hashlib.sha256(json.dumps(entradas, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def renderizar_vista_previa(datos_generales, estudiante, logo_path, dpi=None):
+    """Devuelve el PNG del certificado de un estudiante sin escribir nada en disco.
+
+    El PDF se genera en memoria y PyMuPDF lo rasteriza recortado a la zona
+    con contenido. Las imágenes se guardan en memoria por hash de las
+    entradas, así que volver a una combinación ya vista es inmediato.
+    Devuelve None si PyMuPDF no está instalado.
+    """
+    pymupdf = _pymupdf()
+    if pymupdf is None:
+        return None
+    if dpi is None:
+        dpi = VISTA_PREVIA_DPI
+    clave = huella_vista_previa(datos_generales, estudiante, logo_path, dpi)
+    if clave in _vistas:
+        _vistas.move_to_end(clave)
+        return _vistas[clave]
+
+    from core.certificate_builder import PlantillaCertificado
+    plantilla = PlantillaCertificado(datos_generales, logo_path, guardar_cache=False)
+    contenido = plantilla.renderizar({'dni': estudiante.dni, 'nombre': estudiante.nombre_completo})
+
+    pagina = plantilla.plantilla.pagina
+    with pymupdf.open(stream=contenido, filetype="pdf") as documento:
+        hoja = documento[0]
+        # Hasta el final del marco de contenido más un margen igual al superior
+        alto = hoja.rect.height - pagina['bottomMargin'] + pagina['topMargin']
+        recorte = pymupdf.Rect(0, 0, hoja.rect.width, min(alto, hoja.rect.height))
+        png = hoja.get_pixmap(dpi=dpi, clip=recorte).tobytes("png")
+
+    _vistas[clave] = png
+    while len(_vistas) > VISTA_PREVIA_CACHE:
+        _vistas.popitem(last=False)
+    return png
@@ -1,22 +1,28 @@
 # gui/main_window.py
 import sys
-import json
+from itertools import islice
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QPushButton, 
-    QComboBox, QLabel, QFileDialog, QMessageBox, QHBoxLayout
+    QComboBox, QLabel, QFileDialog, QMessageBox, QHBoxLayout, QProgressBar, QSizePolicy
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QEvent, QThread, QThreadPool, QTimer
+from PyQt5.QtGui import QPixmap
 from pathlib import Path
-from datetime import datetime
-from core.pdf_processor import leer_campos_pdf
-from core.report_generator import generar_reporte_estudiantes
-from core.certificate_builder import generar_certificados
+from gui.workers import GeneracionWorker, VistaPreviaTarea
+# core.pdf_processor y core.pipeline (PyPDF2, ReportLab) se importan al usarlos
+# para que la ventana aparezca sin esperar a las librerías PDF
+
+# Estudiantes que se ofrecen para la vista previa (el listado puede ser muy largo)
+MAX_ESTUDIANTES_VISTA = 200
+
+# Espera tras el último cambio antes de volver a renderizar la vista previa
+ESPERA_VISTA_PREVIA_MS = 300
 
 class SimpleApp(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Aliboat (by: +59172906023)")
-        self.resize(400, 300)
+        self.resize(900, 560)
         
         # Habilitar drag & drop
         self.setAcceptDrops(True)
@@ -24,6 +30,22 @@ class SimpleApp(QMainWindow):
         # Variables
         self.pdf_path = None
         self.datos_pdf = {}
+        self.medicion = None
+        self.listado_path = None
+        self.hilo = None
+        self.worker = None
+        self.firma_catalogo = None
+        
+        # Vista previa: se renderiza cuando los cambios se detienen un momento
+        self.temporizador_vista = QTimer(self)
+        self.temporizador_vista.setSingleShot(True)
+        self.temporizador_vista.setInterval(ESPERA_VISTA_PREVIA_MS)
+        self.temporizador_vista.timeout.connect(self.actualizar_vista_previa)
+        self.vista_previa = None
+        # Un solo hilo para la vista previa: las peticiones se atienden en orden
+        self.hilos_vista = QThreadPool(self)
+        self.hilos_vista.setMaxThreadCount(1)
+        self.peticion_vista = 0
         
         # Configurar interfaz
         central_widget = QWidget()
@@ -48,17 +70,48 @@ class SimpleApp(QMainWindow):
         
         # Cargar datos de barcos e instructores
         self.cargar_datos_combobox()
+        self.combo_instructor.currentIndexChanged.connect(self.programar_vista_previa)
+        self.combo_barco.currentIndexChanged.connect(self.programar_vista_previa)
+        
+        # Estudiante de la vista previa
+        layout.addWidget(QLabel("Vista previa de:"))
+        self.combo_estudiante = QComboBox()
+        self.combo_estudiante.currentIndexChanged.connect(self.programar_vista_previa)
+        layout.addWidget(self.combo_estudiante)
         
         # 4. Botón de generación
         self.btn_generar = QPushButton("Generar Certificados y Reporte")
         self.btn_generar.clicked.connect(self.generar_documentos)
         layout.addWidget(self.btn_generar)
         
-        # 5. Estado
+        # 5. Progreso y cancelación
+        progreso_layout = QHBoxLayout()
+        self.barra_progreso = QProgressBar()
+        self.barra_progreso.setVisible(False)
+        progreso_layout.addWidget(self.barra_progreso)
+        self.btn_cancelar = QPushButton("Cancelar")
+        self.btn_cancelar.setVisible(False)
+        self.btn_cancelar.clicked.connect(self.cancelar_generacion)
+        progreso_layout.addWidget(self.btn_cancelar)
+        layout.addLayout(progreso_layout)
+        
+        # 6. Estado
         self.lbl_estado = QLabel("Listo para comenzar")
         layout.addWidget(self.lbl_estado)
         
-        central_widget.setLayout(layout)
+        layout.addStretch()
+        
+        # 7. Vista previa del certificado a la derecha de los controles
+        self.lbl_vista_previa = QLabel("Vista previa")
+        self.lbl_vista_previa.setAlignment(Qt.AlignCenter)
+        self.lbl_vista_previa.setMinimumSize(320, 240)
+        self.lbl_vista_previa.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.lbl_vista_previa.setStyleSheet("background: white; border: 1px solid #ccc;")
+        
+        principal = QHBoxLayout()
+        principal.addLayout(layout, 1)
+        principal.addWidget(self.lbl_vista_previa, 2)
+        central_widget.setLayout(principal)
         self.setCentralWidget(central_widget)
         
         # Cargar PDF inicial
@@ -74,6 +127,8 @@ class SimpleApp(QMainWindow):
             )
         if ruta:
             self.pdf_path = ruta
+            # El listado soltado antes era de otro PDF: se vuelve a los campos D_
+            self.listado_path = None
             self.cargar_datos_pdf()
             return True
         return False
@@ -92,30 +147,59 @@ class SimpleApp(QMainWindow):
                 if self.cargar_pdf(file_path):
                     self.lbl_estado.setText(f"PDF cargado: {Path(file_path).name}")
                 break
+            if file_path.lower().endswith(('.csv', '.xlsx')):
+                # Listado de estudiantes en lugar de los campos D_ del PDF
+                self.listado_path = file_path
+                self.lbl_estado.setText(f"Listado de estudiantes: {Path(file_path).name}")
+                self.cargar_estudiantes_vista()
+                break
 
     # ======================
     # Carga de datos
     # ======================
     def cargar_datos_combobox(self):
         try:
-            with open('resources/datos.json', 'r', encoding='utf-8') as f:
-                datos = json.load(f)
-                
-                self.combo_instructor.clear()
-                self.combo_instructor.addItem("")  # Opción vacía
-                for instructor in datos['instructores']:
-                    # Almacenar objeto completo como dato de usuario
-                    self.combo_instructor.addItem(instructor['nombre'], userData=instructor)
-                
-                self.combo_barco.clear()
-                self.combo_barco.addItem("")  # Opción vacía
-                for barco in datos['barcos']:
-                    self.combo_barco.addItem(barco['nombre'])
+            from core.catalogo import obtener_catalogo
+            catalogo = obtener_catalogo()
+            self.firma_catalogo = catalogo.firma
+            
+            self.combo_instructor.clear()
+            self.combo_instructor.addItem("")  # Opción vacía
+            for instructor in catalogo.instructores:
+                # Almacenar objeto completo como dato de usuario
+                self.combo_instructor.addItem(instructor['nombre'], userData=instructor)
+            
+            self.combo_barco.clear()
+            self.combo_barco.addItem("")  # Opción vacía
+            for barco in catalogo.barcos:
+                self.combo_barco.addItem(barco['nombre'])
                     
         except Exception as e:
             QMessageBox.critical(self, "Error", f"No se pudo cargar datos: {str(e)}")
             self.lbl_estado.setText("Error cargando datos")
 
+    def refrescar_combobox(self):
+        """Vuelve a llenar instructores y barcos si datos.json ha cambiado,
+        conservando la selección si sigue existiendo"""
+        from core.catalogo import obtener_catalogo
+        try:
+            if obtener_catalogo().firma == self.firma_catalogo:
+                return
+        except (OSError, ValueError):
+            return
+        instructor = self.combo_instructor.currentText()
+        barco = self.combo_barco.currentText()
+        self.cargar_datos_combobox()
+        self.combo_instructor.setCurrentIndex(max(0, self.combo_instructor.findText(instructor)))
+        self.combo_barco.setCurrentIndex(max(0, self.combo_barco.findText(barco)))
+        self.programar_vista_previa()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        # Al volver a la ventana (p. ej. tras editar datos.json)
+        if event.type() == QEvent.ActivationChange and self.isActiveWindow():
+            self.refrescar_combobox()
+
     def cargar_datos_pdf(self):
         if self.pdf_path is None:
             self.lbl_estado.setText("No hay PDF cargado")
@@ -124,7 +208,12 @@ class SimpleApp(QMainWindow):
         self.lbl_estado.setText("Leyendo PDF...")
         QApplication.processEvents()  # Actualizar UI
         
-        self.datos_pdf = leer_campos_pdf(self.pdf_path)
+        from core.pdf_processor import leer_campos_pdf
+        from core.instrumentacion import Medicion
+        # La lectura se anota en la misma medición que la generación siguiente
+        self.medicion = Medicion()
+        with self.medicion:
+            self.datos_pdf = leer_campos_pdf(self.pdf_path)
         if not self.datos_pdf:
             self.lbl_estado.setText("Error: No se pudieron leer los campos")
             return False
@@ -136,8 +225,78 @@ class SimpleApp(QMainWindow):
         print("==================================\n")
         
         self.lbl_estado.setText(f"Datos cargados: {len(self.datos_pdf)} campos")
+        self.cargar_estudiantes_vista()
         return True
 
+    # ======================
+    # Vista previa
+    # ======================
+    def cargar_estudiantes_vista(self):
+        """Rellena el selector de la vista previa con los primeros estudiantes"""
+        from core.listado import ListadoFormulario, abrir_listado
+        try:
+            listado = abrir_listado(self.listado_path) if self.listado_path else ListadoFormulario(self.datos_pdf)
+            estudiantes = list(islice(listado, MAX_ESTUDIANTES_VISTA))
+        except Exception as e:
+            print(f"No se pudieron leer los estudiantes para la vista previa: {str(e)}")
+            estudiantes = []
+        self.combo_estudiante.blockSignals(True)
+        self.combo_estudiante.clear()
+        for estudiante in estudiantes:
+            self.combo_estudiante.addItem(f"{estudiante.nombre_completo} ({estudiante.dni})", userData=estudiante)
+        self.combo_estudiante.blockSignals(False)
+        self.programar_vista_previa()
+
+    def programar_vista_previa(self, *args):
+        """Reinicia la espera: solo se renderiza cuando se dejan de hacer cambios"""
+        self.temporizador_vista.start()
+
+    def actualizar_vista_previa(self):
+        """Pide en segundo plano el certificado del estudiante elegido"""
+        self.peticion_vista += 1
+        estudiante = self.combo_estudiante.currentData()
+        if not self.datos_pdf or estudiante is None:
+            self.vista_previa = None
+            self.lbl_vista_previa.setPixmap(QPixmap())
+            self.lbl_vista_previa.setText("Vista previa")
+            return
+        index_instructor = self.combo_instructor.currentIndex()
+        instructor_obj = self.combo_instructor.itemData(index_instructor) if index_instructor > 0 else None
+        tarea = VistaPreviaTarea(self.peticion_vista, self.vista_vigente, self.datos_pdf, instructor_obj,
+                                 self.combo_barco.currentText(), estudiante, Path("aliboat logo.png"))
+        tarea.senales.lista.connect(self.vista_previa_lista)
+        tarea.senales.fallo.connect(self.vista_previa_fallida)
+        self.hilos_vista.start(tarea)
+
+    def vista_vigente(self, numero):
+        return numero == self.peticion_vista
+
+    def vista_previa_fallida(self, numero, mensaje):
+        if not self.vista_vigente(numero):
+            return
+        self.vista_previa = None
+        self.lbl_vista_previa.setText(f"No se pudo generar la vista previa:\n{mensaje}")
+
+    def vista_previa_lista(self, numero, png):
+        """Muestra el PNG renderizado salvo que ya se haya pedido otra vista previa"""
+        if not self.vista_vigente(numero):
+            return
+        if png is None:
+            self.lbl_vista_previa.setText("Vista previa no disponible (instale PyMuPDF)")
+            return
+        self.vista_previa = QPixmap()
+        self.vista_previa.loadFromData(png, "PNG")
+        self.mostrar_vista_previa()
+
+    def mostrar_vista_previa(self):
+        if self.vista_previa is not None:
+            self.lbl_vista_previa.setPixmap(self.vista_previa.scaled(
+                self.lbl_vista_previa.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.mostrar_vista_previa()
+
     def generar_documentos(self):
         if self.pdf_path is None:
             QMessageBox.warning(self, "Advertencia", "Por favor, cargue un archivo PDF primero")
@@ -146,84 +305,102 @@ class SimpleApp(QMainWindow):
         if not self.datos_pdf:
             if not self.cargar_datos_pdf():
                 return
+        self.refrescar_combobox()
         
         # Obtener datos seleccionados
         index_instructor = self.combo_instructor.currentIndex()
         instructor_obj = self.combo_instructor.itemData(index_instructor) if index_instructor > 0 else None
         barco = self.combo_barco.currentText()
+        from core.pipeline import aplicar_selecciones
+        datos_pdf_actualizados = aplicar_selecciones(self.datos_pdf, instructor_obj, barco)
         
-        # Solo actualizar si hay instructor seleccionado
-        datos_pdf_actualizados = self.datos_pdf.copy()
-        if instructor_obj:
-            datos_pdf_actualizados['A_INSTR'] = instructor_obj['nombre']
-            datos_pdf_actualizados['A_DNI'] = instructor_obj['dni']
-            print(f"DEBUG: Instructor actualizado - {instructor_obj['nombre']} (DNI: {instructor_obj['dni']})")
-        # Si no hay instructor seleccionado, no modificar A_INSTR ni A_DNI
-
-        # Si hay barco seleccionado, actualizar todos los campos del barco
-        if barco and barco.strip():
-            try:
-                with open('resources/datos.json', 'r', encoding='utf-8') as f:
-                    datos = json.load(f)
-                barco_obj = next((b for b in datos['barcos'] if b['nombre'] == barco), None)
-                if barco_obj:
-                    datos_pdf_actualizados['B_NOMEMB'] = barco_obj['nombre']
-                    datos_pdf_actualizados['B_MATRICULA'] = barco_obj['matricula']
-                    datos_pdf_actualizados['B_PANTALAN'] = barco_obj['pantalan']
-                    datos_pdf_actualizados['B_AMARRE'] = barco_obj['amarre']
-                    datos_pdf_actualizados['B_POTENCIA'] = barco_obj['potencia']
-                    datos_pdf_actualizados['B_ESLORA'] = barco_obj['eslora']
-                    datos_pdf_actualizados['B_INSTAL'] = barco_obj['instalacion']
-                    print(f"DEBUG: Barco actualizado - {barco_obj}")
-            except Exception as e:
-                print(f"Error cargando datos del barco: {e}")
-        
-        # DEBUG: Mostrar campos modificados
-        print("\n=== CAMPOS ACTUALIZADOS ===")
-        print(f"A_INSTR: {datos_pdf_actualizados.get('A_INSTR', 'No modificado')}")
-        print(f"B_NOMEMB: {datos_pdf_actualizados.get('B_NOMEMB', 'No modificado')}")
-        print("===========================\n")
-        
-        # Crear carpeta de salida
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_dir = Path("output") / timestamp
-        output_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Generar certificados y guardar PDF modificado
-        self.lbl_estado.setText("Generando documentos...")
-        QApplication.processEvents()
-        
-        logo_path = Path("aliboat logo.png")
-        
-        # Guardar PDF modificado
-        from core.pdf_processor import procesar_pdf
-        pdf_modificado = procesar_pdf(
-            self.pdf_path,
-            datos_pdf_actualizados,
-            output_dir
-        )
-        
-        # Generar certificados
-        certificados = generar_certificados(datos_pdf_actualizados, output_dir, logo_path)
-        
-        # Actualizar estado
-        self.lbl_estado.setText(f"PDF modificado guardado: {Path(pdf_modificado).name}")
+        # Generar en segundo plano para que la ventana siga respondiendo
+        self.hilo = QThread(self)
+        self.worker = GeneracionWorker(self.pdf_path, datos_pdf_actualizados, self.medicion, self.listado_path)
+        self.medicion = None
+        self.worker.moveToThread(self.hilo)
+        self.hilo.started.connect(self.worker.run)
+        self.worker.estado.connect(self.lbl_estado.setText)
+        self.worker.progreso.connect(self.actualizar_progreso)
+        self.worker.terminado.connect(self.generacion_terminada)
+        self.worker.fallo.connect(self.generacion_fallida)
+        self.worker.terminado.connect(self.hilo.quit)
+        self.worker.fallo.connect(self.hilo.quit)
+        self.hilo.finished.connect(self.worker.deleteLater)
+        self.hilo.finished.connect(self.hilo.deleteLater)
+        self.hilo.finished.connect(lambda hilo=self.hilo: self._hilo_terminado(hilo))
         
-        # Extraer estudiantes para el reporte
-        estudiantes = []
-        i = 1
-        while f"D_{i}" in datos_pdf_actualizados and f"D_{i+1}" in datos_pdf_actualizados:
-            estudiantes.append((datos_pdf_actualizados[f"D_{i}"], datos_pdf_actualizados[f"D_{i+1}"]))
-            i += 2
-        
-        # Generar reporte Excel
-        self.lbl_estado.setText("Generando reporte Excel...")
-        QApplication.processEvents()
-        generar_reporte_estudiantes(datos_pdf_actualizados, estudiantes, output_dir)
+        self.btn_generar.setEnabled(False)
+        self.btn_actualizar.setEnabled(False)
+        self.barra_progreso.setValue(0)
+        self.barra_progreso.setVisible(True)
+        self.btn_cancelar.setEnabled(True)
+        self.btn_cancelar.setVisible(True)
+        self.lbl_estado.setText("Generando documentos...")
+        self.hilo.start()
+
+    def actualizar_progreso(self, hechos, total):
+        self.barra_progreso.setMaximum(total)
+        self.barra_progreso.setValue(hechos)
+        self.lbl_estado.setText(f"Certificado {hechos} de {total}")
+
+    def cancelar_generacion(self):
+        if self.worker:
+            self.worker.cancelar()
+            self.btn_cancelar.setEnabled(False)
+            self.lbl_estado.setText("Cancelando...")
+
+    def _hilo_terminado(self, hilo):
+        if hilo is self.hilo:
+            self.hilo = None
+
+    def closeEvent(self, event):
+        """Cancela la generación en curso y espera a que su hilo termine antes de cerrar"""
+        if self.worker is not None:
+            # La ventana se cierra: sus resultados ya no se muestran
+            for senal in (self.worker.estado, self.worker.progreso, self.worker.terminado, self.worker.fallo):
+                senal.disconnect()
+            self.worker.cancelar()
+        if self.hilo is not None:
+            # quit directo: la señal encolada no llegaría con este hilo esperando
+            self.hilo.quit()
+            self.hilo.wait()
+        self.hilos_vista.clear()
+        self.hilos_vista.waitForDone()
+        super().closeEvent(event)
+
+    def _fin_generacion(self):
+        self.btn_generar.setEnabled(True)
+        self.btn_actualizar.setEnabled(True)
+        self.barra_progreso.setVisible(False)
+        self.btn_cancelar.setVisible(False)
+        self.worker = None
+
+    def generacion_terminada(self, resultado):
+        self._fin_generacion()
+        output_dir = resultado['output_dir']
+        if resultado['cancelado']:
+            QMessageBox.warning(
+                self,
+                "Cancelado",
+                f"Generación cancelada:\n- {len(resultado['certificados'])} certificados generados\n\nGuardados en:\n{output_dir.resolve()}"
+            )
+            return
         
         self.lbl_estado.setText(f"Documentos generados en: {output_dir}")
+        aviso = ""
+        if resultado['duplicados']:
+            nombres = "\n".join(f"  {nombre} ({dni})" for dni, nombre, _ in resultado['duplicados'][:10])
+            aviso = f"\n\nYa tenían certificado de esta fecha:\n{nombres}"
+            if len(resultado['duplicados']) > 10:
+                aviso += f"\n  ... y {len(resultado['duplicados']) - 10} más"
         QMessageBox.information(
             self, 
             "Éxito", 
-            f"Proceso completado:\n- {len(certificados)} certificados\n- Reporte Excel\n\nGuardados en:\n{output_dir.resolve()}"
+            f"Proceso completado:\n- {len(resultado['certificados'])} certificados\n- Reporte Excel\n\nGuardados en:\n{output_dir.resolve()}{aviso}"
         )
+
+    def generacion_fallida(self, mensaje):
+        self._fin_generacion()
+        self.lbl_estado.setText("Error generando documentos")
+        QMessageBox.critical(self, "Error", f"No se pudieron generar los documentos: {mensaje}")
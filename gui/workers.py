@@ -0,0 +1,110 @@
+# gui/workers.py
+import threading
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+class GeneracionWorker(QObject):
+    """Ejecuta la generación en un QThread para no bloquear la interfaz"""
+    progreso = pyqtSignal(int, int)
+    estado = pyqtSignal(str)
+    terminado = pyqtSignal(object)
+    fallo = pyqtSignal(str)
+
+    def __init__(self, pdf_path, datos_pdf, medicion=None, listado_path=None):
+        super().__init__()
+        self.pdf_path = pdf_path
+        self.datos_pdf = datos_pdf
+        self.medicion = medicion
+        self.listado_path = listado_path
+        self._cancelar = threading.Event()
+        self._trabajo_servicio = None
+
+    def run(self):
+        try:
+            from config import SERVICIO_GUI
+            if SERVICIO_GUI and self._generar_en_servicio():
+                return
+            from core.pipeline import ejecutar_generacion
+            from core.listado import abrir_listado
+            listado = abrir_listado(self.listado_path) if self.listado_path else None
+            resultado = ejecutar_generacion(
+                self.pdf_path,
+                self.datos_pdf,
+                estado=self.estado.emit,
+                progreso=self.progreso.emit,
+                cancelado=self._cancelar.is_set,
+                medicion=self.medicion,
+                listado=listado
+            )
+        except Exception as e:
+            self.fallo.emit(str(e))
+        else:
+            self.terminado.emit(resultado)
+
+    def _generar_en_servicio(self):
+        """Envía el trabajo al servicio local si está en marcha; False si no lo está"""
+        from pathlib import Path
+        from core.servicio import enviar_trabajo, esperar_trabajo, resultado_trabajo, servicio_disponible
+        if not servicio_disponible():
+            return False
+        self.estado.emit("Generando documentos en el servicio local...")
+        resumen = enviar_trabajo(self.pdf_path, esperar=False, campos=self.datos_pdf,
+                                 listado=self.listado_path, prioridad=0)
+        self._trabajo_servicio = resumen['id']
+        # Si se canceló mientras se enviaba, cancelar() aún no conocía el trabajo
+        if self._cancelar.is_set():
+            self._cancelar_en_servicio()
+        resultado = resultado_trabajo(esperar_trabajo(resumen['id']))
+        if resultado['error']:
+            self.fallo.emit(resultado['error'])
+        else:
+            resultado.update(output_dir=Path(resultado['output_dir']),
+                             cancelado=bool(resultado.get('cancelado')))
+            self.terminado.emit(resultado)
+        return True
+
+    def _cancelar_en_servicio(self):
+        from core.servicio import cancelar_trabajo
+        try:
+            cancelar_trabajo(self._trabajo_servicio)
+        except Exception as e:
+            print(f"No se pudo cancelar el trabajo en el servicio: {str(e)}")
+
+    def cancelar(self):
+        self._cancelar.set()
+        if self._trabajo_servicio is not None:
+            self._cancelar_en_servicio()
+
+class _SenalesVistaPrevia(QObject):
+    lista = pyqtSignal(int, object)  # número de petición, PNG (None sin PyMuPDF)
+    fallo = pyqtSignal(int, str)
+
+class VistaPreviaTarea(QRunnable):
+    """Renderiza la vista previa fuera del hilo de la interfaz.
+
+    Cada petición lleva un número; si vigente(numero) es False cuando le toca
+    empezar (ya se pidió otra) no se renderiza, y la ventana descarta los
+    resultados de peticiones antiguas.
+    """
+    def __init__(self, numero, vigente, datos_pdf, instructor, barco, estudiante, logo_path):
+        super().__init__()
+        self.senales = _SenalesVistaPrevia()
+        self.numero = numero
+        self.vigente = vigente
+        self.datos_pdf = datos_pdf
+        self.instructor = instructor
+        self.barco = barco
+        self.estudiante = estudiante
+        self.logo_path = logo_path
+
+    def run(self):
+        if not self.vigente(self.numero):
+            return
+        try:
+            from core.pipeline import seleccionar_datos
+            from core.vista_previa import renderizar_vista_previa
+            datos = seleccionar_datos(self.datos_pdf, self.instructor, self.barco)
+            png = renderizar_vista_previa(datos, self.estudiante, self.logo_path)
+        except Exception as e:
+            self.senales.fallo.emit(self.numero, str(e))
+        else:
+            self.senales.lista.emit(self.numero, png)
@@ -1,18 +1,97 @@
 # main.py
 import sys
+import time
+from multiprocessing import freeze_support
 from pathlib import Path
 
+INICIO = time.perf_counter()
+
 # Añadir directorio del proyecto al path
 sys.path.append(str(Path(__file__).parent))
 
-from PyQt5.QtWidgets import QApplication
-from gui.main_window import SimpleApp
+def carpeta_aplicacion():
+    """Carpeta del ejecutable congelado o del código fuente"""
+    if getattr(sys, 'frozen', False):
+        return Path(sys.executable).parent
+    return Path(__file__).parent
+
+def medir_arranque():
+    """Muestra el tiempo de importación de cada módulo y hasta ver la ventana.
+
+    El ejecutable no tiene consola, así que los tiempos también se guardan
+    en tiempos_arranque.txt junto a él y se muestran en un cuadro de diálogo.
+    """
+    from core.arranque import MODULOS_PESADOS, medir_importaciones
+
+    tiempos = medir_importaciones(["PyQt5.QtWidgets", "gui.main_window"])
+    from PyQt5.QtWidgets import QApplication, QMessageBox
+    from gui.main_window import SimpleApp
+
+    app = QApplication(sys.argv[:1])
+    window = SimpleApp()
+    window.show()
+    app.processEvents()
+    ventana = time.perf_counter() - INICIO
+
+    tiempos += medir_importaciones(MODULOS_PESADOS)
+    lineas = [f"{modulo:<28} {segundos * 1000:8.1f} ms" for modulo, segundos in tiempos]
+    lineas.append(f"{'Ventana visible':<28} {ventana * 1000:8.1f} ms")
+    texto = "\n".join(lineas)
+    if sys.stdout is not None:
+        print(f"\n=== TIEMPOS DE ARRANQUE ===\n{texto}\n===========================\n")
+
+    ruta = carpeta_aplicacion() / "tiempos_arranque.txt"
+    try:
+        ruta.write_text(texto + "\n", encoding='utf-8')
+        guardado = f"\n\nGuardado en:\n{ruta}"
+    except OSError as e:
+        guardado = f"\n\nNo se pudo guardar en {ruta}: {str(e)}"
+    caja = QMessageBox(QMessageBox.Information, "Tiempos de arranque", texto + guardado, parent=window)
+    caja.setStyleSheet("QLabel { font-family: monospace; }")
+    caja.exec_()
+    return 0
+
+def argumentos_cli(argumentos):
+    """Argumentos del modo por lotes, o None si hay que abrir la ventana.
+
+    Solo se entra en el modo por lotes con el subcomando "lotes" o alguna
+    opción (--servir, --instructor...); abrir o soltar un PDF sobre el
+    ejecutable solo pasa su ruta y abre la ventana con ese PDF.
+    """
+    if argumentos[:1] == ["lotes"]:
+        return argumentos[1:]
+    if any(argumento.startswith("-") for argumento in argumentos):
+        return argumentos
+    return None
 
 def main():
-    app = QApplication(sys.argv)
+    if sys.argv[1:] == ["--medir-arranque"]:
+        sys.exit(medir_arranque())
+
+    argumentos = argumentos_cli(sys.argv[1:])
+    if argumentos is not None:
+        from cli import main as main_cli
+        sys.exit(main_cli(argumentos))
+
+    from PyQt5.QtWidgets import QApplication
+    from gui.main_window import SimpleApp
+
+    app = QApplication(sys.argv[:1])
     window = SimpleApp()
     window.show()
+
+    # PDF abierto con la aplicación (o soltado sobre el ejecutable)
+    pdfs = [ruta for ruta in sys.argv[1:] if ruta.lower().endswith('.pdf') and Path(ruta).is_file()]
+    if pdfs:
+        window.cargar_pdf(pdfs[0])
+
+    # Cargar las librerías PDF mientras el usuario elige el archivo
+    from core.arranque import precargar_en_segundo_plano
+    precargar_en_segundo_plano()
+
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
+    # Necesario para el pool de procesos dentro del ejecutable congelado
+    freeze_support()
     main()
@@ -0,0 +1,37 @@
+# tests/test_instrumentacion.py
+import threading
+from core.escritor import EscritorAsincrono
+from core.instrumentacion import Medicion, contar
+
+def test_mediciones_anidadas_y_concurrentes(tmp_path):
+    """Cada ejecución anota en su propia medición y al salir se restaura la anterior"""
+    exterior, interior = Medicion(perfil=""), Medicion(perfil="")
+    with exterior:
+        with interior:
+            contar("paginas")
+        contar("paginas")
+    assert exterior.contadores == {"paginas": 1}
+    assert interior.contadores == {"paginas": 1}
+    contar("paginas")  # sin medición activa no anota en ninguna
+
+    mediciones = [Medicion(perfil="") for _ in range(4)]
+    barrera = threading.Barrier(len(mediciones))
+
+    def ejecutar(medicion):
+        with medicion:
+            barrera.wait()
+            contar("certificados")
+            # El hilo del escritor anota en la medición de su lote
+            escritor = EscritorAsincrono()
+            escritor.encolar(tmp_path / f"{id(medicion)}.pdf", b"%PDF")
+            escritor.cerrar()
+
+    hilos = [threading.Thread(target=ejecutar, args=(m,)) for m in mediciones]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    for medicion in mediciones:
+        assert medicion.contadores["certificados"] == 1
+        assert medicion.contadores["bytes_escritos"] == 4
+        assert len(medicion.duraciones["escritura"]) == 1
@@ -0,0 +1,31 @@
+# tests/test_registro.py
+from bench_pipeline import LOGO, crear_pdf_practicas
+from core.certificate_builder import generar_certificados
+from core.pdf_processor import leer_campos_pdf
+from core.pipeline import extraer_estudiantes
+from core.registro import RegistroCertificados
+
+def test_registro_activado_tras_ejecucion_sin_registro(tmp_path, monkeypatch):
+    """Los certificados reutilizados de una ejecución sin registro se anotan al activarlo"""
+    monkeypatch.chdir(tmp_path)
+    pdf = tmp_path / "practica.pdf"
+    crear_pdf_practicas(pdf, 3)
+    datos_pdf = leer_campos_pdf(pdf, usar_cache=False)
+
+    primera = generar_certificados(datos_pdf, tmp_path / "o1", LOGO, workers=1,
+                                   origen=pdf, incremental=True)
+    assert len(primera) == 3
+
+    with RegistroCertificados(tmp_path / "registro.sqlite") as registro:
+        segunda = generar_certificados(datos_pdf, tmp_path / "o2", LOGO, workers=1,
+                                       origen=pdf, incremental=True, registro=registro)
+        assert len(segunda) == 3
+        filas = registro.entre_fechas("01/01/1900", "31/12/2999")
+        assert sorted(fila['ruta'] for fila in filas) == sorted(str(ruta.resolve()) for ruta in segunda)
+        for estudiante in extraer_estudiantes(datos_pdf):
+            assert registro.reimprimir(estudiante.dni) is not None
+
+        # Una tercera ejecución sin cambios actualiza las filas en lugar de duplicarlas
+        generar_certificados(datos_pdf, tmp_path / "o3", LOGO, workers=1,
+                             origen=pdf, incremental=True, registro=registro)
+        assert len(registro.entre_fechas("01/01/1900", "31/12/2999")) == 3
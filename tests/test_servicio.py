@@ -0,0 +1,38 @@
+# tests/test_servicio.py
+import threading
+import time
+from cli import _mostrar
+from core.servicio import ServicioRender, resultado_trabajo
+
+def test_cancelar_antes_de_empezar(tmp_path, monkeypatch, capsys):
+    """Un trabajo cancelado en cola no se ejecuta y su resultado se puede mostrar"""
+    monkeypatch.chdir(tmp_path)
+    # Sin despachador al crear el servicio, el trabajo se queda en cola
+    despachar = ServicioRender._despachar
+    monkeypatch.setattr(ServicioRender, '_despachar', lambda self: None)
+    servicio = ServicioRender(1, salida=tmp_path / "out")
+    try:
+        trabajo = servicio.enviar({'ruta_pdf': str(tmp_path / "practica.pdf")})
+        assert servicio.cancelar(trabajo.id) is trabajo
+        assert trabajo.hecho.is_set() and trabajo.estado == "cancelado"
+
+        # El despachador descarta el trabajo cancelado sin ejecutarlo
+        servicio._despachador = threading.Thread(target=despachar, args=(servicio,), daemon=True)
+        servicio._despachador.start()
+        for _ in range(200):
+            if servicio.cola.empty():
+                break
+            time.sleep(0.01)
+        assert servicio.cola.empty()
+    finally:
+        servicio.cerrar()
+    assert trabajo.estado == "cancelado" and trabajo.iniciado is None
+    assert servicio.estado()['cancelados'] == 1
+
+    resultado = resultado_trabajo(trabajo.resumen())
+    completo = {'pdf', 'error', 'output_dir', 'certificados', 'reporte', 'errores',
+                'duplicados', 'cancelado', 'segundos'}
+    assert completo <= resultado.keys()
+    assert resultado['cancelado'] and resultado['error'] is None
+    assert list(_mostrar([resultado])) == [resultado]
+    assert "CANCELADO" in capsys.readouterr().out